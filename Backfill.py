@@ -0,0 +1,200 @@
+import argparse
+import os
+import time
+import numpy as np
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from KrakenAPI import KrakenDataProvider
+from OHLCStore import DATA_DIR, OHLC_STORE_DIR, OHLCStore
+
+# /OHLC віддає лише 720 останніх свічок, тож давніша історія дрібних
+# інтервалів будується з угод /Trades. Найдрібніший інтервал рахується з угод,
+# решта агрегуються з нього
+BACKFILL_INTERVALS = [15, 60, 240]
+# Скільки днів історії завантажувати
+BACKFILL_DAYS = 365
+# Скільки пар завантажуються паралельно; загальний темп запитів
+# обмежує token bucket HttpTransport для api.kraken.com
+BACKFILL_WORKERS = 4
+# Проміжні свічки зберігаються кожні стільки сторінок /Trades
+CHECKPOINT_PAGES = 20
+# Повтори сторінки після помилки Kraken (зокрема "EAPI:Rate limit exceeded")
+PAGE_RETRIES = 5
+PAGE_RETRY_DELAY = 2
+# Проміжні свічки незавершених завантажень
+STAGING_DIR = os.path.join(DATA_DIR, "backfill")
+
+
+class HistoryBackfill:
+    # Дозавантаження історії пар у сховище OHLCStore, яке читає дашборд.
+    # Угоди посторінково перетворюються на свічки найдрібнішого інтервалу
+    # в окремому сховищі staging, курсор /Trades зберігається разом з ними,
+    # тож після збою завантаження продовжується з останньої контрольної точки.
+    # Коли угоди дійшли до вікна /OHLC, історія всіх інтервалів додається
+    # в store перед наявними свічками (OHLCStore.prepend)
+    def __init__(
+        self,
+        kraken,
+        store,
+        staging,
+        intervals=BACKFILL_INTERVALS,
+        days=BACKFILL_DAYS,
+        workers=BACKFILL_WORKERS,
+    ):
+        self.kraken = kraken
+        self.store = store
+        self.staging = staging
+        self.intervals = sorted(int(i) for i in intervals)
+        self.days = days
+        self.workers = workers
+
+    def run(self, pairs=None):
+        # Пари за замовчуванням - усі пари з USD; повертає pair -> кількість свічок
+        if pairs is None:
+            pairs = sorted(self.kraken.get_trading_pairs().values())
+        results = {}
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = {
+                executor.submit(self.backfill_pair, pair): pair for pair in pairs
+            }
+            for future in as_completed(futures):
+                pair = futures[future]
+                try:
+                    results[pair] = future.result()
+                    print(f"{pair}: {results[pair]} candles backfilled")
+                except Exception as e:
+                    print(f"Error backfilling {pair}: {e!r}")
+        return results
+
+    def backfill_pair(self, pair):
+        finest = self.intervals[0]
+        # Початок вирівнюється на найбільший інтервал, щоб перша свічка
+        # кожного інтервалу була повною
+        coarsest = self.intervals[-1] * 60
+        start = int(time.time() - self.days * 86_400) // coarsest * coarsest
+        current, _ = self.current_series(pair, finest)
+        if current.empty:
+            return 0
+        # Угоди потрібні лише до першої свічки, яку вже віддає /OHLC
+        stop = int(current["timestamp"].iloc[0].timestamp())
+        staged = self.staging.load(pair, finest)
+        if staged is not None and staged[1] >= stop * 10**9:
+            # Угоди вже завантажено, але finalize перервався: серію найдрібнішого
+            # інтервалу могло бути подовжено, тож межа береться з курсора,
+            # який після завершення дорівнює початковому stop
+            return self.finalize(pair, staged[1] // 10**9)
+        if stop <= start:
+            return 0
+
+        cursor = staged[1] if staged is not None else start * 10**9
+        pending = []
+        pages = 0
+        while cursor < stop * 10**9:
+            trades, last = self.fetch_page(pair, cursor)
+            pending.append(trades[(trades[:, 0] >= start) & (trades[:, 0] < stop)])
+            # Порожня сторінка означає, що новіших угод немає
+            cursor = stop * 10**9 if last <= cursor else min(last, stop * 10**9)
+            pages += 1
+            finished = cursor >= stop * 10**9
+            if finished or pages % CHECKPOINT_PAGES == 0:
+                pending = [self.checkpoint(pair, pending, cursor, finished)]
+
+        return self.finalize(pair, stop)
+
+    def fetch_page(self, pair, cursor):
+        delay = PAGE_RETRY_DELAY
+        for attempt in range(PAGE_RETRIES):
+            try:
+                return self.kraken.fetch_trades(pair, cursor)
+            except Exception as e:
+                if attempt == PAGE_RETRIES - 1:
+                    raise
+                print(f"Retrying trades for {pair} after {delay}s: {e!r}")
+                time.sleep(delay)
+                delay *= 2
+
+    def checkpoint(self, pair, pending, cursor, finished):
+        # Зберігає завершені свічки разом з курсором, з якого треба продовжити.
+        # Угоди незакритої свічки повертаються, щоб дописати її наступними
+        # сторінками; після перезапуску вони завантажуються ще раз
+        finest = self.intervals[0]
+        seconds = finest * 60
+        trades = np.concatenate(pending) if pending else np.empty((0, 3))
+        if finished or len(trades) == 0:
+            complete, rest = trades, trades[:0]
+        else:
+            boundary = int(trades[-1, 0]) // seconds * seconds
+            complete = trades[trades[:, 0] < boundary]
+            rest = trades[trades[:, 0] >= boundary]
+            cursor = boundary * 10**9 - 1
+        candles = self.kraken.trades_to_ohlc(complete, finest)
+        self.staging.append(pair, finest, candles, cursor, gaps=True)
+        return rest
+
+    def current_series(self, pair, interval):
+        # Наявна серія зі сховища; якщо її немає, спершу зберігаються
+        # останні свічки з /OHLC, як це зробив би дашборд
+        cached = self.store.load(pair, interval, self.kraken.price_dtype)
+        if cached is not None and not cached[0].empty:
+            return cached
+        df, last = self.kraken.fetch_ohlc_data(pair, interval, 0)
+        self.store.append(pair, interval, df, last)
+        return df, last
+
+    def finalize(self, pair, stop):
+        # Свічки з угод (і агреговані з них) додаються перед серіями сховища
+        finest = self.intervals[0]
+        staged = self.staging.load(pair, finest)
+        if staged is None:
+            return 0
+        history = staged[0]
+        stop = pd.Timestamp(stop, unit="s")
+        for interval in self.intervals:
+            candles = (
+                history
+                if interval == finest
+                else self.kraken.aggregate_ohlc(history, interval)
+            )
+            # Лише повні свічки перед вікном /OHLC
+            end = candles["timestamp"] + pd.Timedelta(minutes=interval)
+            self.current_series(pair, interval)
+            self.store.prepend(pair, interval, candles[end <= stop])
+        self.staging.remove(pair, finest)
+        return len(history)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Історія пар Kraken з /Trades у локальне сховище OHLC дашборда"
+    )
+    parser.add_argument(
+        "--pairs", nargs="+", help="пари Kraken (за замовчуванням усі пари з USD)"
+    )
+    parser.add_argument("--days", type=int, default=BACKFILL_DAYS)
+    parser.add_argument("--intervals", type=int, nargs="+", default=BACKFILL_INTERVALS)
+    parser.add_argument("--workers", type=int, default=BACKFILL_WORKERS)
+    parser.add_argument("--store", default=OHLC_STORE_DIR)
+    parser.add_argument("--staging", default=STAGING_DIR)
+    parser.add_argument("--base-url", help="адреса API Kraken, наприклад stub сервер")
+    args = parser.parse_args()
+
+    finest = min(args.intervals)
+    if any(interval % finest for interval in args.intervals):
+        parser.error("усі інтервали мають ділитися на найменший")
+
+    kraken = KrakenDataProvider()
+    if args.base_url:
+        kraken.base_url = args.base_url
+    backfill = HistoryBackfill(
+        kraken,
+        OHLCStore(args.store),
+        OHLCStore(args.staging),
+        intervals=args.intervals,
+        days=args.days,
+        workers=args.workers,
+    )
+    backfill.run(args.pairs)
+
+
+if __name__ == "__main__":
+    main()
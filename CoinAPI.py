@@ -1,88 +1,275 @@
+import numpy as np
 import plotly.graph_objects as go
-import requests
-import pandas as pd
 import time
-from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from Metrics import FIGURE_SECONDS, PARSE_SECONDS, STALE_RESPONSES, timed
+from SingleFlight import SingleFlight, mark_stale, stale_since
+from Transport import HttpTransport
+
+# pandas імпортується всередині методів, щоб не сповільнювати старт дашборда
+
+# Скільки історій активів завантажуємо паралельно
+HISTORY_MAX_WORKERS = 8
+# Таймаут одного HTTP запиту, секунди
+REQUEST_TIMEOUT = 10
+# Вікна змін ціни: "<N>d" - N днів, "ytd" - з початку року
+CHANGE_WINDOWS = ["7d", "30d", "60d"]
+# Запас днів історії понад найдовше вікно: остання денна точка CoinCap може
+# бути вчорашньою, а на початку ряду бувають пропущені дні
+HISTORY_SPARE_DAYS = 7
+# Максимальний вік даних у спільному кеші (SharedCache) між воркерами, секунди.
+# Денна історія змінюється рідко, тож живе довше за знімок ринку
+MARKET_SHARED_MAX_AGE = 30
+HISTORY_SHARED_MAX_AGE = 300
+
+
+# Числові колонки відповіді /assets, які CoinCap повертає рядками
+MARKET_NUMERIC_COLUMNS = [
+    "rank",
+    "supply",
+    "maxSupply",
+    "marketCapUsd",
+    "volumeUsd24Hr",
+    "priceUsd",
+    "changePercent24Hr",
+    "vwap24Hr",
+]
+
+
+class MarketSnapshot:
+    # Знімок ринку за один цикл оновлення: завантажується та парситься один раз
+    # і передається всім побудовникам графіків
+    def __init__(
+        self, version, df, fetched_at, display=None, stale_since=None, digest=None
+    ):
+        self.version = version
+        # Хеш вмісту: однакові дані в різних воркерах дають однаковий ключ,
+        # тоді як version - лічильник окремого процесу
+        self.digest = digest
+        self.df = df
+        self.fetched_at = fetched_at
+        # Відформатовані колонки для таблиці та підказок (format_market_data)
+        self.display = display
+        # Час (time.time()) останніх свіжих даних, якщо CoinCap не відповів
+        self.stale_since = stale_since
 
 
 # Ініціалізація програми
 class CoinCapProvider:
-    def __init__(self):
+    def __init__(self, transport=None, shared_cache=None):
         self.base_url = "https://api.coincap.io/v2"
+        self.transport = transport or HttpTransport()
+        # Необов'язковий SharedCache: запит в upstream робить лише один воркер
+        self.shared_cache = shared_cache
+        # Одночасні однакові запити чекають на один запит до CoinCap
+        self._assets_flight = SingleFlight("coincap_assets")
+        self._history_flight = SingleFlight("coincap_history")
+        # Останні вдалі відповіді для stale-while-revalidate: key -> (дані, time.time())
+        self._last_good = {}
+        self.snapshot_version = 0
+        self._snapshot = None
+        self._snapshot_digest = None
+
+    def shared(self, key, max_age, fetch):
+        # fetch() напряму або через спільний кеш, якщо його налаштовано
+        if self.shared_cache is None:
+            return fetch()
+        return self.shared_cache.get_or_refresh(
+            f"coincap:{key}", max_age, lambda previous: fetch()
+        )
+
+    def within_budget(self, flight, key, fetch, budget=None):
+        # fetch() через SingleFlight. Якщо відповідь не вклалася в budget секунд
+        # або fetch повернув None, повертається остання вдала відповідь
+        # з позначкою mark_stale, а запит завершується у фоні
+        def remember():
+            value = fetch()
+            if value is not None:
+                self._last_good[(flight.name, key)] = (value, time.time())
+            return value
+
+        try:
+            value = flight.do(key, remember, timeout=budget)
+        except Exception as e:
+            print(f"Error getting {flight.name} {key}: {e!r}")
+            value = None
+        if value is not None:
+            return value
+        last_good = self._last_good.get((flight.name, key))
+        if last_good is None:
+            return None
+        STALE_RESPONSES.inc(data=flight.name)
+        return mark_stale(*last_good)
+
+    def get_historical_data(self, asset_id, days, timeout=REQUEST_TIMEOUT, budget=None):
+        return self.within_budget(
+            self._history_flight,
+            (asset_id, days),
+            lambda: self.shared(
+                f"history:{asset_id}:{days}",
+                HISTORY_SHARED_MAX_AGE,
+                lambda: self.fetch_historical_data(asset_id, days, timeout),
+            ),
+            budget,
+        )
 
-    def get_historical_data(self, asset_id, days):
+    def fetch_historical_data(self, asset_id, days, timeout=REQUEST_TIMEOUT):
         end = int(time.time() * 1000)
         start = int((datetime.now() - timedelta(days=days)).timestamp() * 1000)
 
         try:
-            response = requests.get(
+            response = self.transport.get(
                 f"{self.base_url}/assets/{asset_id}/history",
                 params={"interval": "d1", "start": start, "end": end},
+                timeout=timeout,
             )
             if response.status_code == 200:
-                data = response.json()["data"]
-                df = pd.DataFrame(data)
-                df["priceUsd"] = pd.to_numeric(df["priceUsd"])
-                return df
+                return self.parse_historical_data(response.json()["data"])
             return None
         except Exception as e:
             print(f"Error getting data for {asset_id}: {e}")
             return None
 
-    def calculate_price_change(self, df, days):
-        if df is None or len(df) < days:
-            return None
+    @timed(PARSE_SECONDS, stage="coincap_history")
+    def parse_historical_data(self, data):
+        import pandas as pd
+
+        df = pd.DataFrame(data)
+        df["priceUsd"] = pd.to_numeric(df["priceUsd"])
+        return df
+
+    def window_days(self, window, end_date):
+        # Кількість днів вікна, що закінчується датою end_date
+        if window == "ytd":
+            return (end_date - date(end_date.year, 1, 1)).days
+        return int(window[:-1])
+
+    def build_price_matrix(self, histories):
+        # Вирівнює денні історії в матрицю активи x дні (NaN там, де даних немає,
+        # пропуски всередині ряду заповнюються останньою відомою ціною).
+        # Повертає матрицю та номер першого дня (днів від епохи)
+        valid = [(i, h) for i, h in enumerate(histories) if h is not None and len(h)]
+        if not valid:
+            return np.empty((len(histories), 0)), 0
+
+        rows = np.concatenate([np.full(len(h), i) for i, h in valid])
+        days = np.concatenate(
+            [h["time"].to_numpy(dtype="int64") // 86_400_000 for _, h in valid]
+        )
+        prices = np.concatenate(
+            [h["priceUsd"].to_numpy(dtype="float64") for _, h in valid]
+        )
 
-        start_price = df["priceUsd"].iloc[0]
-        end_price = df["priceUsd"].iloc[-1]
-        return ((end_price - start_price) / start_price) * 100
+        first_day = days.min()
+        matrix = np.full((len(histories), days.max() - first_day + 1), np.nan)
+        matrix[rows, days - first_day] = prices
+
+        filled = np.where(np.isnan(matrix), 0, np.arange(matrix.shape[1]))
+        np.maximum.accumulate(filled, axis=1, out=filled)
+        return matrix[np.arange(len(histories))[:, None], filled], first_day
+
+    def calculate_price_changes(self, matrix, first_day, windows):
+        # Зміни ціни (%) для всіх активів і всіх вікон за один векторний прохід:
+        # остання ціна порівнюється з ціною на N днів раніше.
+        # Повертає матрицю активи x вікна; NaN, якщо історія коротша за вікно
+        last = matrix.shape[1] - 1
+        end_date = date(1970, 1, 1) + timedelta(days=int(first_day) + last)
+        offsets = np.array([self.window_days(w, end_date) for w in windows])
+        columns = last - offsets
+
+        starts = matrix[:, np.clip(columns, 0, None)]
+        starts[:, columns < 0] = np.nan
+        end = matrix[:, last : last + 1]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return (end - starts) / starts * 100
+
+    def get_top_assets_changes(
+        self,
+        limit=10,
+        snapshot=None,
+        max_workers=HISTORY_MAX_WORKERS,
+        timeout=REQUEST_TIMEOUT,
+        windows=CHANGE_WINDOWS,
+        budget=None,
+    ):
+        import pandas as pd
 
-    def get_top_assets_changes(self, limit=10):
         try:
-            response = requests.get(f"{self.base_url}/assets", params={"limit": limit})
-            if response.status_code != 200:
-                raise Exception("Error getting asset list")
-
-            assets = response.json()["data"]
-            changes_data = []
-
-            for asset in assets:
-                asset_id = asset["id"]
-                symbol = asset["symbol"]
-                name = asset["name"]
-
-                hist_data = self.get_historical_data(asset_id, 90)
-                if hist_data is None:
-                    continue
-
-                changes = {
-                    "Symbol": symbol,
-                    "Name": name,
-                    "24h": float(asset["changePercent24Hr"]),
-                    "7d": self.calculate_price_change(hist_data.tail(7), 7),
-                    "30d": self.calculate_price_change(hist_data.tail(30), 30),
-                    "60d": self.calculate_price_change(hist_data.tail(60), 60),
+            if snapshot is not None:
+                assets = snapshot.df.head(limit).to_dict("records")
+            else:
+                response = self.transport.get(
+                    f"{self.base_url}/assets",
+                    params={"limit": limit},
+                    timeout=timeout,
+                )
+                if response.status_code != 200:
+                    raise Exception("Error getting asset list")
+                assets = response.json()["data"]
+
+            # Достатньо історії для найдовшого вікна з запасом
+            history_days = (
+                max(self.window_days(w, date.today()) for w in windows)
+                + HISTORY_SPARE_DAYS
+            )
+
+            # Історії завантажуються паралельно, тож оновлення триває приблизно
+            # стільки, скільки найповільніший запит, а не сума всіх запитів
+            with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+                histories = list(
+                    executor.map(
+                        lambda asset: self.get_historical_data(
+                            asset["id"], history_days, timeout=timeout, budget=budget
+                        ),
+                        assets,
+                    )
+                )
+
+            matrix, first_day = self.build_price_matrix(histories)
+            changes = self.calculate_price_changes(matrix, first_day, windows)
+
+            df = pd.DataFrame(
+                {
+                    "Symbol": [asset["symbol"] for asset in assets],
+                    "Name": [asset["name"] for asset in assets],
+                    "24h": pd.to_numeric(
+                        [asset["changePercent24Hr"] for asset in assets]
+                    ),
                 }
-                changes_data.append(changes)
+            )
+            for window, column in zip(windows, changes.T):
+                df[window] = column
 
-            return pd.DataFrame(changes_data)
+            # Активи без історії пропускаємо
+            loaded = np.array([h is not None for h in histories], dtype=bool)
+            return df[loaded].reset_index(drop=True)
         except Exception as e:
             print(f"Error getting data: {e}")
             return None
 
-    def create_stacked_bar_chart(self):
-        df = self.get_top_assets_changes()
+    @timed(FIGURE_SECONDS, builder="create_stacked_bar_chart")
+    def create_stacked_bar_chart(self, snapshot=None, changes_df=None):
+        df = changes_df
+        if df is None:
+            df = self.get_top_assets_changes(snapshot=snapshot)
         if df is None:
             return go.Figure()
 
-        periods = ["60d", "30d", "7d", "24h"]
+        # Від найдовшого вікна до 24h
+        periods = [c for c in df.columns if c not in ("Symbol", "Name")][::-1]
         colors = ["#FF9999", "#FFB366", "#99FF99", "#66B3FF", "#FF99CC"]
 
         fig = go.Figure()
 
-        for period, color in zip(periods, colors):
+        for i, period in enumerate(periods):
             fig.add_trace(
-                go.Bar(name=period, x=df["Symbol"], y=df[period], marker_color=color)
+                go.Bar(
+                    name=period,
+                    x=df["Symbol"],
+                    y=df[period],
+                    marker_color=colors[i % len(colors)],
+                )
             )
 
         fig.update_layout(
@@ -104,31 +291,125 @@ class CoinCapProvider:
 
         return fig
 
-    def get_market_data(self):
-        # Отримання даних про ринок криптовалют
+    def get_market_data(self, budget=None):
+        # Отримання даних про ринок криптовалют; budget - як у within_budget
+        return self.within_budget(
+            self._assets_flight,
+            "assets",
+            lambda: self.shared(
+                "assets", MARKET_SHARED_MAX_AGE, self.fetch_market_data
+            ),
+            budget,
+        )
+
+    def fetch_market_data(self):
+        # Один запит /assets; None, якщо CoinCap не відповів
         try:
-            response = requests.get(f"{self.base_url}/assets", params={"limit": 250})
+            response = self.transport.get(
+                f"{self.base_url}/assets", params={"limit": 250}
+            )
             if response.status_code != 200:
                 raise Exception("Помилка під час отримання даних")
-            data = response.json()["data"]
-            return pd.DataFrame(data)
+            return self.parse_market_data(response.json()["data"])
         except Exception as e:
             print(f"Помилка під час отримання даних: {e}")
             return None
 
-    def create_market_cap_figure(self):
-        # Створення кругової діаграми капіталізації
-        df = self.get_market_data()
+    @timed(PARSE_SECONDS, stage="coincap_assets")
+    def parse_market_data(self, data):
+        # Перетворення строкових значень у числові один раз для всіх графіків
+        import pandas as pd
+
+        df = pd.DataFrame(data)
+        for col in MARKET_NUMERIC_COLUMNS:
+            if col in df.columns:
+                df[col] = pd.to_numeric(df[col], errors="coerce")
+        return df
+
+    def get_market_snapshot(self, budget=None):
+        # Один запит /assets на цикл оновлення замість окремого для кожного графіка.
+        # Версія змінюється лише тоді, коли змінились самі дані
+        import pandas as pd
+
+        df = self.get_market_data(budget)
         if df is None:
-            return go.Figure()
+            return None
 
-        # Перетворення строкових значень у числові
-        df["marketCapUsd"] = pd.to_numeric(df["marketCapUsd"], errors="coerce")
-        df["priceUsd"] = pd.to_numeric(df["priceUsd"], errors="coerce")
-        df["changePercent24Hr"] = pd.to_numeric(
-            df["changePercent24Hr"], errors="coerce"
+        digest = int(pd.util.hash_pandas_object(df, index=False).sum())
+        if self._snapshot is None or digest != self._snapshot_digest:
+            self.snapshot_version += 1
+            self._snapshot = MarketSnapshot(
+                self.snapshot_version,
+                df,
+                datetime.now(),
+                self.format_market_data(df),
+                digest=f"{len(df)}-{digest:x}",
+            )
+            self._snapshot_digest = digest
+
+        since = stale_since(df)
+        if since is None:
+            return self._snapshot
+        # Ті самі дані, що й в останньому знімку, але з позначкою застарілості
+        snapshot = self._snapshot
+        return MarketSnapshot(
+            snapshot.version,
+            snapshot.df,
+            snapshot.fetched_at,
+            snapshot.display,
+            since,
+            snapshot.digest,
         )
 
+    def format_number(self, values, template):
+        # Векторне форматування числової колонки printf-шаблоном
+        return np.char.mod(template, values.to_numpy(dtype="float64"))
+
+    def format_market_data(self, df):
+        # Усі колонки для відображення будуються один раз на знімок векторними
+        # рядковими операціями, тож таблиця може показувати весь ринок
+        import pandas as pd
+
+        symbol = df["symbol"].str.upper()
+        market_cap = self.format_number(df["marketCapUsd"] / 1_000_000_000, "%.2f")
+        price = self.format_number(df["priceUsd"], "%.2f")
+        volume = self.format_number(df["volumeUsd24Hr"] / 1_000_000, "%.2f")
+        change = self.format_number(df["changePercent24Hr"], "%.2f")
+
+        display = pd.DataFrame(
+            {
+                "Rank": df["rank"],
+                "Symbol": symbol,
+                "Name": df["name"],
+                "Price (USD)": "$" + pd.Series(price, index=df.index),
+                "Market Cap (B)": "$" + pd.Series(market_cap, index=df.index) + "B",
+                "Volume 24h (M)": "$" + pd.Series(volume, index=df.index) + "M",
+                "Change 24h (%)": pd.Series(change, index=df.index) + "%",
+            }
+        )
+        display["hover"] = (
+            "Name: "
+            + df["name"]
+            + "<br>Market Cap: "
+            + display["Market Cap (B)"]
+            + "<br>Price: "
+            + display["Price (USD)"]
+            + "<br>24h Change: "
+            + display["Change 24h (%)"]
+            + "<br>24h Volume: "
+            + display["Volume 24h (M)"]
+        )
+        return display
+
+    @timed(FIGURE_SECONDS, builder="create_market_cap_figure")
+    def create_market_cap_figure(self, snapshot=None):
+        # Створення кругової діаграми капіталізації
+        if snapshot is None:
+            snapshot = self.get_market_snapshot()
+        if snapshot is None:
+            return go.Figure()
+        df = snapshot.df
+
         # Підготовка даних для топ-10 + others
         top_10 = df.head(10)
         others_market_cap = df[10:]["marketCapUsd"].sum()
@@ -137,20 +418,7 @@ class CoinCapProvider:
         values = list(top_10["marketCapUsd"]) + [others_market_cap]
 
         # Підготовка тексту для спливаючих підказок
-        hover_text = []
-        for idx, row in top_10.iterrows():
-            market_cap_billions = float(row["marketCapUsd"]) / 1_000_000_000
-            price = float(row["priceUsd"])
-            change_24h = float(row["changePercent24Hr"])
-            volume = float(row["volumeUsd24Hr"]) / 1_000_000
-
-            hover_text.append(
-                f"Name: {row['name']}<br>"
-                + f"Market Cap: ${market_cap_billions:.2f}B<br>"
-                + f"Price: ${price:.2f}<br>"
-                + f"24h Change: {change_24h:.2f}%<br>"
-                + f"24h Volume: ${volume:.2f}M"
-            )
+        hover_text = list(snapshot.display["hover"].head(10))
 
         others_billions = others_market_cap / 1_000_000_000
         hover_text.append(
@@ -196,53 +464,27 @@ class CoinCapProvider:
 
         return fig
 
-    def create_market_table(self):
-        # Створення таблиці з даними топ-10 криптовалют
-        df = self.get_market_data()
-        if df is None:
+    def create_market_table(self, snapshot=None, top_n=10):
+        # Створення таблиці з даними топ-N криптовалют (None - весь ринок)
+        if snapshot is None:
+            snapshot = self.get_market_snapshot()
+        if snapshot is None:
             return []
 
-        top_10 = df.head(10).copy()
+        display = snapshot.display.drop(columns="hover")
+        if top_n is not None:
+            display = display.head(top_n)
+        return display.to_dict("records")
 
-        # Перетворення даних
-        top_10["marketCapUsd"] = (
-            pd.to_numeric(top_10["marketCapUsd"], errors="coerce") / 1_000_000_000
-        )
-        top_10["priceUsd"] = pd.to_numeric(top_10["priceUsd"], errors="coerce")
-        top_10["changePercent24Hr"] = pd.to_numeric(
-            top_10["changePercent24Hr"], errors="coerce"
-        )
-        top_10["volumeUsd24Hr"] = (
-            pd.to_numeric(top_10["volumeUsd24Hr"], errors="coerce") / 1_000_000
-        )
-
-        # Форматування даних
-        formatted_data = []
-        for _, row in top_10.iterrows():
-            formatted_data.append(
-                {
-                    "Rank": row["rank"],
-                    "Symbol": row["symbol"].upper(),
-                    "Name": row["name"],
-                    "Price (USD)": f"${row['priceUsd']:.2f}",
-                    "Market Cap (B)": f"${row['marketCapUsd']:.2f}B",
-                    "Volume 24h (M)": f"${row['volumeUsd24Hr']:.2f}M",
-                    "Change 24h (%)": f"{row['changePercent24Hr']:.2f}%",
-                }
-            )
-
-        return formatted_data
-
-    def create_volume_chart(self):
+    @timed(FIGURE_SECONDS, builder="create_volume_chart")
+    def create_volume_chart(self, snapshot=None):
 
         # Отримуємо дані про ринок
-        df = self.get_market_data()
-
-        if df is None:
+        if snapshot is None:
+            snapshot = self.get_market_snapshot()
+        if snapshot is None:
             return go.Figure()
-
-        # Перетворимо рядкові значення на числові
-        df["volumeUsd24Hr"] = pd.to_numeric(df["volumeUsd24Hr"], errors="coerce")
+        df = snapshot.df
 
         # Беремо топ-10 криптовалют за обсягом
         top_10 = df.nlargest(10, "volumeUsd24Hr")
@@ -298,7 +540,7 @@ class CoinCapProvider:
 
         # Додаємо тимчасову мітку
         fig.add_annotation(
-            text=f"Дані оновлені: {pd.Timestamp.now().strftime('%Y-%m-%d %H:%M:%S')}",
+            text=f"Дані оновлені: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}",
             xref="paper",
             yref="paper",
             x=1,
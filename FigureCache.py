@@ -0,0 +1,50 @@
+import json
+import threading
+from collections import OrderedDict
+
+# Скільки серіалізованих фігур тримаємо в пам'яті
+FIGURE_CACHE_SIZE = 64
+
+
+def frame_version(df, tail=None):
+    # Версія даних DataFrame для ключа кешу. Для серій, які лише дописуються,
+    # достатньо довжини та хешу кількох останніх рядків (tail)
+    import pandas as pd
+
+    if df is None:
+        return "none"
+    part = df if tail is None else df.tail(tail)
+    digest = int(pd.util.hash_pandas_object(part, index=False).sum())
+    return f"{len(df)}-{digest:x}"
+
+
+class FigureCache:
+    # Кеш фігур за ключем (побудовник, параметри, версія даних).
+    # Фігура серіалізується в JSON один раз і далі віддається готовим словником,
+    # тож Dash не будує та не перевіряє її заново на кожен запит
+    def __init__(self, max_entries=FIGURE_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def key(self, builder, params, version):
+        # Рядковий ключ, який можна зберегти в dcc.Store на клієнті
+        return json.dumps([builder, params, version], default=str)
+
+    def get(self, builder, params, version, build):
+        # Повертає (ключ, серіалізована фігура), будуючи її лише при промаху
+        key = self.key(builder, params, version)
+        with self._lock:
+            figure = self._entries.get(key)
+            if figure is not None:
+                self._entries.move_to_end(key)
+                return key, figure
+
+        figure = json.loads(build().to_json())
+
+        with self._lock:
+            self._entries[key] = figure
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return key, figure
@@ -0,0 +1,322 @@
+import math
+import threading
+from collections import OrderedDict, deque, namedtuple
+
+import numpy as np
+import pandas as pd
+
+# Скільки серій індикаторів (pair, interval, індикатор, параметри) тримаємо в пам'яті
+INDICATOR_CACHE_SIZE = 64
+
+# Поля свічки, які потрібні індикаторам у step
+Candle = namedtuple("Candle", ["close", "vwap", "volume"])
+
+
+class Indicator:
+    # Індикатор рахується один раз векторно по всій серії (compute), далі
+    # кожна дописана або замінена остання свічка оновлює його за O(1) (step).
+    # Стан зберігається до останньої свічки включно, щоб її можна було замінити
+    outputs = ()
+    # "price" - лінії поверх графіка ціни, "oscillator" - окремий підграфік
+    panel = "price"
+
+    def __init__(self, **params):
+        self.params = params
+
+    def compute(self, df):
+        # Словник output -> numpy масив довжини len(df); готує стан для step
+        raise NotImplementedError
+
+    def step(self, row, replace):
+        # Значення outputs для свічки row; replace - row замінює останню свічку
+        raise NotImplementedError
+
+
+class WindowIndicator(Indicator):
+    # Ковзне вікно останніх period значень із накопиченими сумами:
+    # нове значення додається, найстаріше віднімається
+    size = 1
+
+    def __init__(self, period=20, **params):
+        super().__init__(period=period, **params)
+        self.period = period
+        self.window = deque()
+        self.sums = [0.0] * self.size
+
+    def inputs(self, row):
+        raise NotImplementedError
+
+    def init_window(self, columns):
+        # columns - масиви вхідних значень для останніх свічок серії
+        self.window = deque(zip(*[c[-self.period :] for c in columns]))
+        self.sums = [math.fsum(v) for v in zip(*self.window)] or [0.0] * self.size
+
+    def push(self, row, replace):
+        values = self.inputs(row)
+        if replace and self.window:
+            removed = self.window.pop()
+            self.sums = [s - r for s, r in zip(self.sums, removed)]
+        self.window.append(values)
+        self.sums = [s + v for s, v in zip(self.sums, values)]
+        if len(self.window) > self.period:
+            removed = self.window.popleft()
+            self.sums = [s - r for s, r in zip(self.sums, removed)]
+        return len(self.window) == self.period
+
+
+class SMA(WindowIndicator):
+    outputs = ("sma",)
+
+    def inputs(self, row):
+        return (row.close,)
+
+    def compute(self, df):
+        close = df["close"].to_numpy(dtype="float64")
+        self.init_window([close])
+        return {"sma": pd.Series(close).rolling(self.period).mean().to_numpy()}
+
+    def step(self, row, replace):
+        if not self.push(row, replace):
+            return (np.nan,)
+        return (self.sums[0] / self.period,)
+
+
+class BollingerBands(WindowIndicator):
+    outputs = ("middle", "upper", "lower")
+    size = 2
+
+    def __init__(self, period=20, k=2, **params):
+        super().__init__(period=period, k=k, **params)
+        self.k = k
+
+    def inputs(self, row):
+        return (row.close, row.close * row.close)
+
+    def compute(self, df):
+        close = df["close"].to_numpy(dtype="float64")
+        self.init_window([close, close * close])
+        rolling = pd.Series(close).rolling(self.period)
+        middle = rolling.mean().to_numpy()
+        std = rolling.std(ddof=0).to_numpy()
+        return {
+            "middle": middle,
+            "upper": middle + self.k * std,
+            "lower": middle - self.k * std,
+        }
+
+    def step(self, row, replace):
+        if not self.push(row, replace):
+            return (np.nan, np.nan, np.nan)
+        mean = self.sums[0] / self.period
+        std = math.sqrt(max(0.0, self.sums[1] / self.period - mean * mean))
+        return (mean, mean + self.k * std, mean - self.k * std)
+
+
+class VWAPBands(WindowIndicator):
+    # Ковзний VWAP за period свічок зі смугами ±k зважених обсягом відхилень
+    outputs = ("vwap", "upper", "lower")
+    size = 3
+
+    def __init__(self, period=20, k=2, **params):
+        super().__init__(period=period, k=k, **params)
+        self.k = k
+
+    def inputs(self, row):
+        return (row.volume, row.vwap * row.volume, row.vwap * row.vwap * row.volume)
+
+    def bands(self, volume, pv, p2v):
+        with np.errstate(divide="ignore", invalid="ignore"):
+            vwap = pv / volume
+            std = np.sqrt(np.maximum(0.0, p2v / volume - vwap * vwap))
+        return vwap, vwap + self.k * std, vwap - self.k * std
+
+    def compute(self, df):
+        volume = df["volume"].to_numpy(dtype="float64")
+        price = df["vwap"].to_numpy(dtype="float64")
+        columns = [volume, price * volume, price * price * volume]
+        self.init_window(columns)
+        sums = [pd.Series(c).rolling(self.period).sum().to_numpy() for c in columns]
+        return dict(zip(self.outputs, self.bands(*sums)))
+
+    def step(self, row, replace):
+        if not self.push(row, replace):
+            return (np.nan, np.nan, np.nan)
+        return tuple(float(v) for v in self.bands(*np.array(self.sums)))
+
+
+class EMA(Indicator):
+    # Рекурсивна EMA як pandas ewm(adjust=False): перше значення - перша ціна
+    outputs = ("ema",)
+
+    def __init__(self, period=20, **params):
+        super().__init__(period=period, **params)
+        self.alpha = 2 / (period + 1)
+        # EMA до останньої свічки та з нею
+        self.previous = None
+        self.current = None
+
+    def compute(self, df):
+        close = df["close"]
+        ema = close.ewm(alpha=self.alpha, adjust=False).mean().to_numpy()
+        self.previous = ema[-2] if len(ema) > 1 else None
+        self.current = ema[-1] if len(ema) else None
+        return {"ema": ema}
+
+    def step(self, row, replace):
+        if not replace:
+            self.previous = self.current
+        if self.previous is None:
+            self.current = row.close
+        else:
+            self.current = self.previous + self.alpha * (row.close - self.previous)
+        return (self.current,)
+
+
+class RSI(Indicator):
+    # RSI з усередненням Вайлдера (ewm з alpha=1/period); перші period свічок - NaN
+    outputs = ("rsi",)
+    panel = "oscillator"
+
+    def __init__(self, period=14, **params):
+        super().__init__(period=period, **params)
+        self.period = period
+        # Стан до останньої свічки і з нею (див. state у compute)
+        self.previous = None
+        self.current = None
+
+    def value(self, gain, loss, count):
+        if count < self.period:
+            return np.nan
+        if loss == 0:
+            return 100.0
+        return 100 - 100 / (1 + gain / loss)
+
+    def compute(self, df):
+        close = df["close"].to_numpy(dtype="float64")
+        diff = np.diff(close)
+        gains = pd.Series(np.clip(diff, 0, None))
+        losses = pd.Series(np.clip(-diff, 0, None))
+        alpha = 1 / self.period
+        avg_gain = gains.ewm(alpha=alpha, adjust=False).mean().to_numpy()
+        avg_loss = losses.ewm(alpha=alpha, adjust=False).mean().to_numpy()
+        with np.errstate(divide="ignore", invalid="ignore"):
+            rsi = np.where(avg_loss == 0, 100.0, 100 - 100 / (1 + avg_gain / avg_loss))
+        rsi = np.r_[np.nan, rsi]
+        rsi[: self.period] = np.nan
+
+        def state(i):
+            # (ціна закриття, середній ріст, середнє падіння, кількість змін) після свічки i
+            if i < 0:
+                return None
+            if i == 0:
+                return (close[0], 0.0, 0.0, 0)
+            return (close[i], avg_gain[i - 1], avg_loss[i - 1], i)
+
+        self.previous, self.current = state(len(close) - 2), state(len(close) - 1)
+        return {"rsi": rsi}
+
+    def step(self, row, replace):
+        if not replace:
+            self.previous = self.current
+        if self.previous is None:
+            self.current = (row.close, 0.0, 0.0, 0)
+            return (np.nan,)
+        close, gain, loss, count = self.previous
+        diff = row.close - close
+        if count == 0:
+            gain, loss = max(diff, 0.0), max(-diff, 0.0)
+        else:
+            gain += (max(diff, 0.0) - gain) / self.period
+            loss += (max(-diff, 0.0) - loss) / self.period
+        self.current = (row.close, gain, loss, count + 1)
+        return (self.value(gain, loss, count + 1),)
+
+
+INDICATORS = {
+    "sma": SMA,
+    "ema": EMA,
+    "rsi": RSI,
+    "bollinger": BollingerBands,
+    "vwap_bands": VWAPBands,
+}
+
+
+class IndicatorSeries:
+    # Значення одного індикатора для однієї серії OHLC у масивах, що ростуть
+    # подвоєнням ємності, тож дописування свічки - амортизовано O(1)
+    def __init__(self, indicator):
+        self.indicator = indicator
+        self.values = {}
+        self.length = 0
+        self.first_ts = None
+        self.last_ts = None
+
+    def recompute(self, df):
+        computed = self.indicator.compute(df)
+        capacity = max(16, 2 * len(df))
+        self.values = {}
+        for name, values in computed.items():
+            array = np.full(capacity, np.nan)
+            array[: len(values)] = values
+            self.values[name] = array
+        self.length = len(df)
+        timestamps = df["timestamp"].to_numpy()
+        self.first_ts = timestamps[0] if len(df) else None
+        self.last_ts = timestamps[-1] if len(df) else None
+
+    def set_row(self, index, values):
+        if index >= len(next(iter(self.values.values()))):
+            for name, array in self.values.items():
+                grown = np.full(2 * len(array), np.nan)
+                grown[: len(array)] = array
+                self.values[name] = grown
+        for name, value in zip(self.indicator.outputs, values):
+            self.values[name][index] = value
+
+    def sync(self, df):
+        # Серія з кешу провайдера лише дописується, а остання свічка може
+        # замінюватись (merge_ohlc); інакше індикатор перераховується повністю
+        n = self.length
+        timestamps = df["timestamp"].to_numpy()
+        if (
+            n == 0
+            or len(df) < n
+            or timestamps[0] != self.first_ts
+            or timestamps[n - 1] != self.last_ts
+        ):
+            self.recompute(df)
+            return
+        # Хвіст серії напряму з numpy: itertuples для кількох рядків
+        # коштує більше, ніж сам перерахунок
+        tail = [df[name].to_numpy(dtype="float64")[n - 1 :] for name in Candle._fields]
+        for offset, values in enumerate(zip(*tail)):
+            row = Candle(*values)
+            self.set_row(n - 1 + offset, self.indicator.step(row, replace=offset == 0))
+        self.length = len(df)
+        self.last_ts = timestamps[-1]
+
+    def view(self):
+        return {name: array[: self.length] for name, array in self.values.items()}
+
+
+class IndicatorEngine:
+    # LRU кеш серій індикаторів: (pair, interval, індикатор, параметри) -> IndicatorSeries
+    def __init__(self, cache_size=INDICATOR_CACHE_SIZE):
+        self.cache_size = cache_size
+        self._series = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, pair, interval, df, name, **params):
+        # Значення індикатора name для серії df: output -> масив довжини len(df).
+        # Масиви - подання внутрішнього буфера, їх не можна змінювати
+        key = (pair, int(interval), name, tuple(sorted(params.items())))
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = IndicatorSeries(INDICATORS[name](**params))
+                self._series[key] = series
+            self._series.move_to_end(key)
+            while len(self._series) > self.cache_size:
+                self._series.popitem(last=False)
+            series.sync(df)
+            return series.view()
@@ -1,21 +1,98 @@
-import requests
-import pandas as pd
+import json
+import os
+import tempfile
+import threading
+import time
+import numpy as np
 import plotly.graph_objects as go
-from plotly.subplots import make_subplots
+from collections import OrderedDict
 from datetime import datetime, timedelta
+from KrakenStream import KRAKEN_WS_URL, KrakenStream
+from Metrics import FIGURE_SECONDS, PARSE_SECONDS, STALE_RESPONSES, timed
+from SingleFlight import SingleFlight, mark_stale, stale_since
+from Transport import HttpTransport
+
+# pandas, plotly.subplots і Indicators (з pandas) імпортуються всередині методів,
+# щоб не сповільнювати старт дашборда
+
+# Скільки серій OHLC (pair, interval) тримаємо в пам'яті
+OHLC_CACHE_SIZE = 32
+# Максимальна кількість точок в одній трасі графіка
+MAX_CHART_POINTS = 2000
+# Максимальний вік даних у спільному кеші (SharedCache) між воркерами, секунди
+OHLC_SHARED_MAX_AGE = 5
+PAIRS_SHARED_MAX_AGE = 60 * 60
+# Інтервали свічок Kraken, хвилини
+KRAKEN_INTERVALS = [1, 5, 15, 30, 60, 240, 1440, 10080, 21600]
+# Дрібніша серія з кешу агрегується без запиту, якщо її оновлювали
+# не раніше ніж стільки секунд тому; інакше спершу дозавантажується
+AGGREGATE_MAX_AGE = 60
+# Тип цін open/high/low/close/vwap у серіях OHLC. Пам'ять на свічку:
+# timestamp 8 + ціни 5 x 8 + volume 8 + count 4 = 60 байт; з "float32"
+# (7 значущих цифр, для BTC це ~0.01 USD) - 40 байт
+OHLC_PRICE_DTYPE = "float64"
+PRICE_COLUMNS = ["open", "high", "low", "close", "vwap"]
+# Максимальна кількість угод на сторінці /Trades
+TRADES_PAGE_SIZE = 1000
+# З якої кількості точок лінії малюються через WebGL (Scattergl)
+WEBGL_MIN_POINTS = 1000
+# Кольори ліній індикаторів на графіку ціни
+INDICATOR_COLORS = ["orange", "green", "purple", "brown", "teal"]
 
 
 class KrakenDataProvider:
-    def __init__(self):
+    def __init__(
+        self,
+        cache_size=OHLC_CACHE_SIZE,
+        store=None,
+        transport=None,
+        shared_cache=None,
+        price_dtype=OHLC_PRICE_DTYPE,
+    ):
         self.base_url = "https://api.kraken.com/0/public"
+        # Адреса WebSocket для потокових оновлень; None вимикає потік
+        self.ws_url = KRAKEN_WS_URL
+        self.transport = transport or HttpTransport()
+        self.cache_size = cache_size
+        # "float32" зменшує свічку в пам'яті з 60 до 40 байт (OHLC_PRICE_DTYPE)
+        self.price_dtype = price_dtype
+        # Необов'язкове сховище OHLCStore для теплого старту після перезапуску
+        self.store = store
+        # Необов'язковий SharedCache: серії й список пар оновлює лише один воркер
+        self.shared_cache = shared_cache
+        # LRU кеш: (pair, interval) -> (DataFrame, курсор last від Kraken)
+        self._ohlc_cache = OrderedDict()
+        self._ohlc_lock = threading.Lock()
+        # Час останнього оновлення серій у кеші: (pair, interval) -> time.time()
+        self._ohlc_updated_at = {}
+        # Серії, побудовані агрегацією: (pair, interval) -> інтервал джерела
+        self._ohlc_sources = {}
+        # Перша дата торгів пари не змінюється, тож кешується назавжди
+        self._first_trade_dates = {}
+        # Одночасні запити однієї серії чекають на один запит до Kraken
+        self._ohlc_flight = SingleFlight("kraken_ohlc")
+        # Назви пар для WebSocket API: pair -> wsname і навпаки
+        self._ws_names = {}
+        self._ws_pairs = {}
+        self.stream = None
+        # Індикатори серій (IndicatorEngine): рахуються один раз, далі
+        # оновлюються по свічці; створюються з першим графіком з індикаторами
+        self.indicators = None
 
-    def get_first_trade_date(self, pair):
-        # Отримання першої дати торгів для пари
-        df = self.get_ohlc_data(
-            pair, "21600"
-        )  # Використовуємо максимальний інтервал для ефективності
+    def get_first_trade_date(self, pair, df=None):
+        # Отримання першої дати торгів для пари.
+        # df - вже завантажена серія з максимальним інтервалом, якщо вона є
+        if pair in self._first_trade_dates:
+            return self._first_trade_dates[pair]
+
+        if df is None:
+            df = self.get_ohlc_data(
+                pair, "21600"
+            )  # Використовуємо максимальний інтервал для ефективності
         if not df.empty:
-            return df["timestamp"].min()
+            first_date = df["timestamp"].min()
+            self._first_trade_dates[pair] = first_date
+            return first_date
         return None
 
     def get_trading_pairs(self):
@@ -30,75 +107,525 @@ class KrakenDataProvider:
 
         return filtered_pairs
 
+    def load_trading_pairs_cache(self, path):
+        # Список пар з локального файлу для миттєвого старту; {} якщо файлу немає
+        if not path:
+            return {}
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def save_trading_pairs_cache(self, path, pairs):
+        # Атомарний запис, щоб паралельний старт не прочитав половину файлу
+        # Тимчасовий файл з унікальною назвою в тому ж каталозі, щоб воркери,
+        # які зберігають список одночасно, не писали в один файл
+        directory = os.path.dirname(path) or "."
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(pairs, f)
+            os.replace(tmp_path, path)
+        except Exception:
+            os.remove(tmp_path)
+            raise
+
     def get_asset_pairs(self):
         # Отримання доступних торгових пар
-        response = requests.get(f"{self.base_url}/AssetPairs")
+        if self.shared_cache is None:
+            pairs = self.fetch_asset_pairs()
+        else:
+            pairs = self.shared_cache.get_or_refresh(
+                "kraken:asset_pairs",
+                PAIRS_SHARED_MAX_AGE,
+                lambda previous: self.fetch_asset_pairs(),
+            )
+        if pairs is None:
+            return {}
+        for pair, info in pairs.items():
+            if info.get("wsname"):
+                self._ws_names[pair] = info["wsname"]
+                self._ws_pairs[info["wsname"]] = pair
+        return pairs
+
+    def fetch_asset_pairs(self):
+        # Один запит /AssetPairs; None, якщо Kraken не відповів
+        response = self.transport.get(f"{self.base_url}/AssetPairs")
         if response.status_code == 200:
             return response.json()["result"]
-        return {}
+        return None
+
+    def get_ws_name(self, pair):
+        # Назва пари для WebSocket; список пар завантажується лише якщо її ще немає
+        if pair not in self._ws_names:
+            self.get_asset_pairs()
+        return self._ws_names.get(pair)
+
+    def subscribe_ohlc(self, pair, interval):
+        # Потокові оновлення серії (pair, interval) у кеші з WebSocket Kraken.
+        # Для агрегованої серії підписується її дрібніше джерело.
+        # Повертає False, якщо потік вимкнено або пара не має wsname
+        interval = self._ohlc_sources.get((pair, int(interval)), int(interval))
+        if not self.ws_url:
+            return False
+        wsname = self.get_ws_name(pair)
+        if wsname is None:
+            return False
+        with self._ohlc_lock:
+            if self.stream is None:
+                self.stream = KrakenStream(self.apply_stream_candles, url=self.ws_url)
+        self.stream.subscribe(wsname, interval)
+        return True
+
+    def apply_stream_candles(self, wsname, interval, rows):
+        # Свічки з потоку оновлюють лише серії, які вже є в кеші; курсор last
+        # не змінюється, тож наступний запит REST перекриє їх свічками Kraken
+        pair = self._ws_pairs.get(wsname)
+        new = self.parse_ohlc_data(rows)
+        key = (pair, int(interval))
+        with self._ohlc_lock:
+            cached = self._ohlc_cache.get(key)
+            if cached is None or new.empty:
+                return
+            df, last = cached
+            if not df.empty:
+                begin, latest = new["timestamp"].iloc[0], df["timestamp"].iloc[-1]
+                if begin < latest or self.has_gap(df, new, interval):
+                    # Пропуск після перепідключення заповнить наступний запит REST
+                    return
+            # Нова серія замість зміни рядків на місці: колбеки, які вже взяли
+            # df з кешу (фігура, агрегація, індикатори), бачать узгоджений знімок
+            self._ohlc_cache[key] = (self.merge_ohlc(df, new, interval), last)
+            self._ohlc_updated_at[key] = time.time()
+
+    def unsubscribe_ohlc(self, pair, interval):
+        # Потік більше не оновлює серію, якої немає в кеші
+        wsname = self._ws_names.get(pair)
+        if self.stream is not None and wsname is not None:
+            self.stream.unsubscribe(wsname, interval)
+
+    def get_cached_ohlc(self, pair, interval):
+        # Серія з кешу без запиту до API; None, якщо її ще не завантажено.
+        # Агрегована серія перебудовується з поточного стану джерела
+        source = self._ohlc_sources.get((pair, int(interval)), int(interval))
+        with self._ohlc_lock:
+            cached = self._ohlc_cache.get((pair, source))
+        if cached is None:
+            return None
+        if source != int(interval):
+            return self.aggregate_ohlc(cached[0], interval, source)
+        return cached[0]
+
+    def get_candles(self, pair, interval, days=None, budget=None):
+        # Серія interval для останніх days днів. Якщо в кеші є дрібніша серія,
+        # інтервал якої ділить interval і яка без пропусків покриває весь
+        # період, свічки агрегуються локально без завантаження окремої серії
+        # з Kraken.
+        # days=None (уся історія) завжди завантажує власну серію.
+        # budget - як у get_ohlc_data
+        interval = int(interval)
+        key = (pair, interval)
+        if days is not None:
+            start = datetime.now() - timedelta(days=days)
+            with self._ohlc_lock:
+                sources = [
+                    (
+                        i,
+                        self._ohlc_cache[(pair, i)][0],
+                        self._ohlc_updated_at.get((pair, i), 0),
+                    )
+                    for i in KRAKEN_INTERVALS
+                    if i < interval
+                    and interval % i == 0
+                    and (pair, i) in self._ohlc_cache
+                ]
+            # Найдрібніше джерело, що покриває період
+            for source, df, updated_at in sources:
+                if df.empty or df["timestamp"].iloc[0] > start:
+                    continue
+                if time.time() - updated_at > AGGREGATE_MAX_AGE:
+                    df = self.get_ohlc_data(pair, source, budget)
+                aggregated = self.aggregate_ohlc(df, interval, source)
+                if self.covers(aggregated, interval, start):
+                    self._ohlc_sources[key] = source
+                    if stale_since(df) is not None:
+                        aggregated = mark_stale(aggregated, stale_since(df))
+                    return aggregated
+        self._ohlc_sources.pop(key, None)
+        return self.get_ohlc_data(pair, interval, budget)
+
+    def covers(self, df, interval, start):
+        # Серія має свічки від start (включно зі свічкою, що його містить)
+        # до кінця без пропусків
+        if df.empty or df["timestamp"].iloc[0] > start:
+            return False
+        ts = df["timestamp"].to_numpy()
+        window = ts[ts > np.datetime64(start) - np.timedelta64(int(interval), "m")]
+        return bool((np.diff(window) == np.timedelta64(int(interval), "m")).all())
 
-    def get_ohlc_data(self, pair, interval="1440"):
+    def aggregate_ohlc(self, df, interval, source=None):
+        # Векторна агрегація свічок у інтервал interval (хвилини). Межі свічок
+        # кратні тривалості від епохи Unix, як у Kraken (тижневі - з четверга).
+        # Неповна перша свічка відкидається; VWAP зважується обсягом.
+        # source - інтервал свічок df: тоді відкидаються й свічки, в яких
+        # бракує рядків джерела (пропуск у серії); остання, ще не закрита,
+        # може бути неповною, але без пропусків від свого початку.
+        # Без source (свічки з угод, де інтервали без угод відсутні) пропуски
+        # всередині свічки дозволені. Типи колонок - як у parse_ohlc_data
+        import pandas as pd
+
+        seconds = int(interval) * 60
+        ts = df["timestamp"].to_numpy().astype("datetime64[s]").astype("int64")
+        if len(ts) == 0:
+            return df.iloc[:0]
+        buckets = ts // seconds * seconds
+        starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+        ends = np.r_[starts[1:], len(ts)] - 1
+
+        volume = df["volume"].to_numpy()
+        volume_sum = np.add.reduceat(volume, starts)
+        weighted = np.add.reduceat(df["vwap"].to_numpy() * volume, starts)
+        close = df["close"].to_numpy()[ends]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            vwap = np.where(volume_sum > 0, weighted / volume_sum, close)
+
+        result = pd.DataFrame(
+            {
+                "timestamp": pd.to_datetime(buckets[starts], unit="s"),
+                "open": df["open"].to_numpy()[starts].astype(self.price_dtype),
+                "high": np.maximum.reduceat(df["high"].to_numpy(), starts).astype(
+                    self.price_dtype
+                ),
+                "low": np.minimum.reduceat(df["low"].to_numpy(), starts).astype(
+                    self.price_dtype
+                ),
+                "close": close.astype(self.price_dtype),
+                "vwap": vwap.astype(self.price_dtype),
+                "volume": volume_sum,
+                "count": np.add.reduceat(
+                    df["count"].to_numpy(), starts, dtype="int64"
+                ).astype("int32"),
+            }
+        )
+        if source is None:
+            if ts[0] != buckets[0]:
+                result = result.iloc[1:].reset_index(drop=True)
+            return result
+        step = int(source) * 60
+        # Рядки свічки відсортовані й унікальні, тож вона без пропусків, якщо
+        # починається з межі і кількість рядків відповідає її тривалості
+        contiguous = (ts[starts] == buckets[starts]) & (
+            ends - starts == (ts[ends] - ts[starts]) // step
+        )
+        complete = ts[ends] == buckets[starts] + seconds - step
+        complete[-1] = True
+        keep = contiguous & complete
+        if keep.all():
+            return result
+        return result[keep].reset_index(drop=True)
+
+    def get_ohlc_data(self, pair, interval="1440", budget=None):
         # Отримання OHLC даних interval у хвилинах: 1, 5, 15, 30, 60, 240, 1440, 10080, 21600
+        # Повна історія завантажується один раз, далі лише нові свічки від курсора last.
+        # Повернений DataFrame спільний для всіх викликів, його не можна змінювати.
+        # budget - скільки секунд викликач готовий чекати: якщо запит не вклався
+        # або Kraken недоступний, повертається остання серія з позначкою mark_stale,
+        # а запит завершується у фоні й оновлює кеш
+        key = (pair, int(interval))
+        try:
+            return self._ohlc_flight.do(
+                key, lambda: self.update_ohlc_data(pair, interval), timeout=budget
+            )
+        except Exception as e:
+            with self._ohlc_lock:
+                cached = self._ohlc_cache.get(key)
+                updated_at = self._ohlc_updated_at.get(key)
+            if cached is None and self.store is not None:
+                cached = self.store.load(pair, interval, self.price_dtype)
+            if cached is None or cached[0].empty:
+                raise
+            if updated_at is None:
+                # Серія зі сховища актуальна щонайменше на час останньої свічки
+                updated_at = cached[0]["timestamp"].iloc[-1].timestamp()
+            print(f"Serving cached OHLC for {pair} {interval}: {e!r}")
+            STALE_RESPONSES.inc(data="kraken_ohlc")
+            return mark_stale(cached[0], updated_at)
+
+    def update_ohlc_data(self, pair, interval):
+        # Дозавантаження серії і оновлення кешу; викликається через SingleFlight
+        key = (pair, int(interval))
+        with self._ohlc_lock:
+            cached = self._ohlc_cache.get(key)
+
+        if cached is None and self.store is not None:
+            cached = self.store.load(pair, interval, self.price_dtype)
+
+        if self.shared_cache is None:
+            df, last = self.refresh_ohlc(pair, interval, cached)
+        else:
+            # Дописує свічки до серії зі спільного кешу, а якщо її там ще немає -
+            # до локальної. Сховище на диску теж пише лише цей воркер
+            df, last = self.shared_cache.get_or_refresh(
+                f"kraken:ohlc:{pair}:{int(interval)}",
+                OHLC_SHARED_MAX_AGE,
+                lambda previous: self.refresh_ohlc(pair, interval, previous or cached),
+            )
+
+        with self._ohlc_lock:
+            self._ohlc_cache[key] = (df, last)
+            self._ohlc_updated_at[key] = time.time()
+            self._ohlc_cache.move_to_end(key)
+            evicted = []
+            while len(self._ohlc_cache) > self.cache_size:
+                evicted.append(self._ohlc_cache.popitem(last=False)[0])
+                self._ohlc_updated_at.pop(evicted[-1], None)
+        for evicted_pair, evicted_interval in evicted:
+            self.unsubscribe_ohlc(evicted_pair, evicted_interval)
+
+        return df
+
+    def refresh_ohlc(self, pair, interval, cached):
+        # Нові свічки від курсора last кешованої серії; (DataFrame, last)
+        if cached is None:
+            since = int((datetime.now() - timedelta(days=365 * 10)).timestamp())
+        else:
+            since = cached[1]
+
+        new, last = self.fetch_ohlc_data(pair, interval, since)
+        if self.store is not None:
+            self.store.append(pair, interval, new, last)
+
+        df = new if cached is None else self.merge_ohlc(cached[0], new, interval)
+        return df, last
+
+    def has_gap(self, cached, new, interval):
+        # /OHLC віддає лише 720 останніх свічок незалежно від since, тож після
+        # довшої паузи нові свічки починаються не одразу за кешованими
+        if cached.empty or new.empty:
+            return False
+        step = np.timedelta64(int(interval), "m")
+        return new["timestamp"].iloc[0] > cached["timestamp"].iloc[-1] + step
+
+    def merge_ohlc(self, cached, new, interval):
+        # Нові свічки замінюють кешовані з тим самим або пізнішим часом,
+        # тож незакрита поточна свічка оновлюється, а не дублюється.
+        # Якщо між серіями є пропуск, кешовані свічки відкидаються: серія
+        # без дірки посередині починається з нового вікна
+        import pandas as pd
+
+        if new.empty:
+            return cached
+        if self.has_gap(cached, new, interval):
+            return new
+        # Серія відсортована, тож межу знаходить бінарний пошук, а не маска
+        kept = cached.iloc[: cached["timestamp"].searchsorted(new["timestamp"].iloc[0])]
+        return pd.concat([kept, new], ignore_index=True)
+
+    def fetch_ohlc_data(self, pair, interval, since):
+        # Один запит /OHLC; повертає DataFrame і курсор last для наступного запиту
         params = {
             "pair": pair,
             "interval": interval,
-            "since": int((datetime.now() - timedelta(days=365 * 10)).timestamp()),
+            "since": since,
         }
-        response = requests.get(f"{self.base_url}/OHLC", params=params)
+        response = self.transport.get(f"{self.base_url}/OHLC", params=params)
         if response.status_code != 200:
             raise Exception("Помилка під час отримання даних")
 
-        data = response.json()["result"][pair]
-
-        print(data[0])
-
-        # Перетворення даних у DataFrame
-        df = pd.DataFrame(
-            data,
-            columns=[
-                "timestamp",
-                "open",
-                "high",
-                "low",
-                "close",
-                "vwap",
-                "volume",
-                "count",
-            ],
+        payload = response.json()
+        # Як і в fetch_trades: помилки Kraken (зокрема ліміт запитів) приходять
+        # з кодом 200 у полі error
+        if payload.get("error"):
+            raise Exception(f"Kraken error: {', '.join(payload['error'])}")
+        result = payload["result"]
+        return self.parse_ohlc_data(result[pair]), int(result.get("last", since))
+
+    def fetch_trades(self, pair, since):
+        # Одна сторінка /Trades: до TRADES_PAGE_SIZE угод після курсора since
+        # (наносекунди). Повертає масив рядків (час, ціна, обсяг) і курсор last
+        params = {"pair": pair, "since": since, "count": TRADES_PAGE_SIZE}
+        response = self.transport.get(f"{self.base_url}/Trades", params=params)
+        if response.status_code != 200:
+            raise Exception("Помилка під час отримання угод")
+
+        payload = response.json()
+        # Kraken повідомляє про перевищення ліміту з кодом 200 у полі error
+        if payload.get("error"):
+            raise Exception(f"Kraken error: {', '.join(payload['error'])}")
+        result = payload["result"]
+        trades = self.parse_trades(result[pair])
+        return trades, int(result.get("last", since))
+
+    @timed(PARSE_SECONDS, stage="kraken_trades")
+    def parse_trades(self, data):
+        # Рядки /Trades: [ціна, обсяг, час, сторона, тип, misc, id]
+        trades = np.empty((len(data), 3))
+        if data:
+            trades[:, 0] = [row[2] for row in data]
+            trades[:, 1] = np.array([row[0] for row in data], dtype=float)
+            trades[:, 2] = np.array([row[1] for row in data], dtype=float)
+        return trades
+
+    def trades_to_ohlc(self, trades, interval):
+        # Свічки interval (хвилини) з угод, відсортованих за часом; межі свічок
+        # як в aggregate_ohlc, типи колонок - як у parse_ohlc_data.
+        # Інтервали без угод пропускаються
+        import pandas as pd
+
+        seconds = int(interval) * 60
+        times, prices, volumes = trades[:, 0], trades[:, 1], trades[:, 2]
+        if len(times) == 0:
+            return self.parse_ohlc_data([])
+        buckets = times.astype("int64") // seconds * seconds
+        starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+        ends = np.r_[starts[1:], len(times)] - 1
+
+        volume = np.add.reduceat(volumes, starts)
+        close = prices[ends]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            vwap = np.where(
+                volume > 0, np.add.reduceat(prices * volumes, starts) / volume, close
+            )
+        return pd.DataFrame(
+            {
+                "timestamp": pd.to_datetime(buckets[starts], unit="s"),
+                "open": prices[starts].astype(self.price_dtype),
+                "high": np.maximum.reduceat(prices, starts).astype(self.price_dtype),
+                "low": np.minimum.reduceat(prices, starts).astype(self.price_dtype),
+                "close": close.astype(self.price_dtype),
+                "vwap": vwap.astype(self.price_dtype),
+                "volume": volume,
+                "count": np.diff(np.r_[starts, len(times)]).astype("int32"),
+            }
         )
 
-        # Конвертація типів даних
-        df["timestamp"] = pd.to_datetime(df["timestamp"], unit="s")
-        for col in ["open", "high", "low", "close", "vwap", "volume"]:
-            df[col] = df[col].astype(float)
+    @timed(PARSE_SECONDS, stage="kraken_ohlc")
+    def parse_ohlc_data(self, data):
+        # Розбір рядків відповіді /OHLC: [time, open, high, low, close, vwap,
+        # volume, count], ціни й обсяг - рядки. Кожна колонка одразу стає
+        # типізованим масивом numpy (рядки розбираються в C), без проміжного
+        # DataFrame з колонками object і astype по одній колонці
+        import pandas as pd
 
-        return df
+        columns = list(zip(*data)) or [()] * 8
+        timestamp = np.array(columns[0], dtype="int64")
+        frame = {
+            "timestamp": timestamp.astype("datetime64[s]").astype("datetime64[ns]")
+        }
+        for number, col in enumerate(PRICE_COLUMNS, start=1):
+            frame[col] = np.array(columns[number], dtype=self.price_dtype)
+        frame["volume"] = np.array(columns[6], dtype="float64")
+        frame["count"] = np.array(columns[7], dtype="int32")
+        return pd.DataFrame(frame, copy=False)
+
+    def get_indicator(self, pair, interval, df, name, **params):
+        # Значення індикатора name для серії df пари: output -> масив довжини
+        # len(df). Для серії, що лише дописується, повторний виклик коштує O(1)
+        # на кожну нову або оновлену свічку
+        from Indicators import IndicatorEngine
+
+        with self._ohlc_lock:
+            if self.indicators is None:
+                self.indicators = IndicatorEngine()
+        return self.indicators.get(pair, interval, df, name, **params)
+
+    def downsample_price(self, df, max_points):
+        # Min/max проріджування: у кожному кошику залишаємо свічки з мінімальною
+        # та максимальною ціною закриття, тож піки й провали не губляться
+        import pandas as pd
+
+        if len(df) <= max_points:
+            return df
+        buckets = np.arange(len(df)) * max(1, max_points // 2) // len(df)
+        grouped = pd.Series(df["close"].to_numpy()).groupby(buckets)
+        idx = np.union1d(grouped.idxmin().to_numpy(), grouped.idxmax().to_numpy())
+        return df.iloc[idx]
+
+    def downsample_volume(self, df, max_points):
+        # Обсяг сумується по кошиках і ставиться на час першої свічки кошика
+        import pandas as pd
+
+        if len(df) <= max_points:
+            return df[["timestamp", "volume"]]
+        buckets = np.arange(len(df)) * max_points // len(df)
+        return df.groupby(buckets).agg({"timestamp": "first", "volume": "sum"})
 
-    def create_visualization(self, pair, interval="1440", days_back=30):
-        # Створення візуалізації з графіком ціни та обсягу
-        # Отримання даних
-        df = self.get_ohlc_data(pair, interval)
+    @timed(FIGURE_SECONDS, builder="create_visualization")
+    def create_visualization(
+        self,
+        pair,
+        interval="1440",
+        days_back=30,
+        x_range=None,
+        max_points=MAX_CHART_POINTS,
+        df=None,
+        indicators=None,
+    ):
+        # Створення візуалізації з графіком ціни та обсягу.
+        # indicators - список (підпис, назва з INDICATORS, параметри)
+        # Отримання даних, якщо викликач ще не завантажив серію
+        import pandas as pd
+        from plotly.subplots import make_subplots
+        from Indicators import INDICATORS
 
-        # Створення графіка з підграфіком
+        if df is None:
+            df = self.get_ohlc_data(pair, interval)
+
+        # Видиме вікно: останні days_back днів або діапазон після zoom/pan.
+        # Межа None означає початок/кінець усієї історії
+        if x_range is None:
+            focus_start = datetime.now() - timedelta(days=days_back)
+            focus_end = datetime.now()
+        else:
+            focus_start, focus_end = x_range
+        if focus_start is None:
+            focus_start = df["timestamp"].min()
+        if focus_end is None:
+            focus_end = df["timestamp"].max()
+
+        # Вікно передаємо з повною деталізацією (до max_points точок),
+        # решту історії грубо, щоб панорамування не показувало порожнечу
+        before = df[df["timestamp"] < focus_start]
+        focus = df[(df["timestamp"] >= focus_start) & (df["timestamp"] <= focus_end)]
+        after = df[df["timestamp"] > focus_end]
+        context_points = max_points // 4
+        parts = [(before, context_points), (focus, max_points), (after, context_points)]
+        price = pd.concat([self.downsample_price(p, n) for p, n in parts])
+        volume = pd.concat([self.downsample_volume(p, n) for p, n in parts])
+        # SVG сповільнює перемальовування на тисячах точок, WebGL - ні
+        scatter = go.Scattergl if len(price) >= WEBGL_MIN_POINTS else go.Scatter
+
+        indicators = indicators or []
+        oscillators = [
+            label
+            for label, name, params in indicators
+            if INDICATORS[name].panel == "oscillator"
+        ]
+
+        # Створення графіка з підграфіком; осцилятори (RSI) - третім рядком
+        titles = [f"Price {pair}", "Trading volume"]
+        row_heights = [0.7, 0.3]
+        if oscillators:
+            titles.append(", ".join(oscillators))
+            row_heights = [0.6, 0.2, 0.2]
         fig = make_subplots(
-            rows=2,
+            rows=len(titles),
             cols=1,
             shared_xaxes=True,
             vertical_spacing=0.03,
-            subplot_titles=(f"Price {pair}", "Trading volume"),
-            row_heights=[0.7, 0.3],
+            subplot_titles=titles,
+            row_heights=row_heights,
         )
 
-        focus_start = datetime.now() - timedelta(days=days_back)
-        focus_end = datetime.now()
-
         fig.update_xaxes(range=[focus_start, focus_end])
 
         # Додавання графіка ціни
         fig.add_trace(
-            go.Scatter(
-                x=df["timestamp"],
-                y=df["close"],
+            scatter(
+                x=price["timestamp"],
+                y=price["close"],
                 mode="lines",
                 name="Close date",
                 line=dict(color="blue"),
@@ -110,8 +637,8 @@ class KrakenDataProvider:
         # Додавання графіка обсягу
         fig.add_trace(
             go.Bar(
-                x=df["timestamp"],
-                y=df["volume"],
+                x=volume["timestamp"],
+                y=volume["volume"],
                 name="Volume",
                 marker_color="rgba(0,0,255,0.3)",
             ),
@@ -119,12 +646,48 @@ class KrakenDataProvider:
             col=1,
         )
 
+        # Індикатори після ціни й обсягу, щоб номери їхніх трас не змінювались.
+        # Значення беруться в тих самих свічках, що й проріджена ціна
+        positions = np.searchsorted(df["timestamp"].to_numpy(), price["timestamp"])
+        for number, (label, name, params) in enumerate(indicators):
+            color = INDICATOR_COLORS[number % len(INDICATOR_COLORS)]
+            row = 3 if INDICATORS[name].panel == "oscillator" else 1
+            values = self.get_indicator(pair, interval, df, name, **params)
+            for output, series in values.items():
+                # Смуги пунктиром, основна лінія суцільна
+                band = output in ("upper", "lower")
+                fig.add_trace(
+                    scatter(
+                        x=price["timestamp"],
+                        y=series[positions],
+                        mode="lines",
+                        name=f"{label} {output}" if len(values) > 1 else label,
+                        legendgroup=label,
+                        line=dict(color=color, width=1, dash="dot" if band else None),
+                        # За meta потокове оновлення знаходить значення траси
+                        meta={"indicator": name, "params": params, "output": output},
+                    ),
+                    row=row,
+                    col=1,
+                )
+
         # Налаштування макета
         fig.update_layout(
             height=800,
             showlegend=True,
             title_text=f"Chart of {pair} for the last {days_back} days",
             xaxis_rangeslider_visible=False,
+            # Зберігає zoom користувача, коли фігура замінюється перепроріджуваною
+            uirevision=f"{pair}-{interval}",
+            # Вікно з повною деталізацією: zoom усередині нього браузер
+            # обробляє сам, без повторного проріджування на сервері
+            meta={
+                "detail": [
+                    pd.Timestamp(focus_start).isoformat(),
+                    pd.Timestamp(focus_end).isoformat(),
+                ],
+                "exact": len(focus) <= max_points,
+            },
         )
 
         return fig
@@ -0,0 +1,259 @@
+import base64
+import hashlib
+import json
+import os
+import socket
+import ssl
+import struct
+import threading
+from urllib.parse import urlparse
+
+# Публічний WebSocket API Kraken (v1: пари у форматі wsname, наприклад "XBT/USD")
+KRAKEN_WS_URL = "wss://ws.kraken.com"
+# Kraken надсилає heartbeat щосекунди, тож тиша довше за це означає обрив
+STREAM_TIMEOUT = 30
+# Затримка перепідключення, секунди: подвоюється до максимуму після кожної невдачі
+RECONNECT_DELAY = 1
+MAX_RECONNECT_DELAY = 30
+
+WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+OP_CONTINUATION, OP_TEXT, OP_BINARY = 0x0, 0x1, 0x2
+OP_CLOSE, OP_PING, OP_PONG = 0x8, 0x9, 0xA
+
+
+def accept_key(key):
+    # Значення Sec-WebSocket-Accept для ключа клієнта (RFC 6455)
+    digest = hashlib.sha1((key + WS_GUID).encode()).digest()
+    return base64.b64encode(digest).decode()
+
+
+def encode_frame(opcode, payload, mask):
+    # Один завершений кадр; клієнт зобов'язаний маскувати дані, сервер - ні
+    header = bytes([0x80 | opcode])
+    mask_bit = 0x80 if mask else 0
+    length = len(payload)
+    if length < 126:
+        header += bytes([mask_bit | length])
+    elif length < 1 << 16:
+        header += bytes([mask_bit | 126]) + struct.pack("!H", length)
+    else:
+        header += bytes([mask_bit | 127]) + struct.pack("!Q", length)
+    if not mask:
+        return header + payload
+    key = os.urandom(4)
+    return header + key + apply_mask(payload, key)
+
+
+def apply_mask(payload, key):
+    # XOR з 4-байтовим ключем цілим числом, а не побайтово в циклі
+    repeated = (key * (len(payload) // 4 + 1))[: len(payload)]
+    value = int.from_bytes(payload, "big") ^ int.from_bytes(repeated, "big")
+    return value.to_bytes(len(payload), "big")
+
+
+def read_exact(reader, size):
+    data = reader.read(size)
+    if len(data) < size:
+        raise ConnectionError("WebSocket connection closed")
+    return data
+
+
+def read_frame(reader):
+    # Повертає (fin, opcode, payload) одного кадру
+    first, second = read_exact(reader, 2)
+    length = second & 0x7F
+    if length == 126:
+        length = struct.unpack("!H", read_exact(reader, 2))[0]
+    elif length == 127:
+        length = struct.unpack("!Q", read_exact(reader, 8))[0]
+    key = read_exact(reader, 4) if second & 0x80 else None
+    payload = read_exact(reader, length)
+    if key:
+        payload = apply_mask(payload, key)
+    return bool(first & 0x80), first & 0x0F, payload
+
+
+class WebSocketConnection:
+    # Мінімальний клієнт WebSocket на стандартній бібліотеці: текстові
+    # повідомлення, ping/pong і закриття - все, що потрібно для каналів Kraken
+    def __init__(self, url, timeout=STREAM_TIMEOUT):
+        parsed = urlparse(url)
+        secure = parsed.scheme == "wss"
+        host = parsed.hostname
+        port = parsed.port or (443 if secure else 80)
+        sock = socket.create_connection((host, port), timeout=timeout)
+        if secure:
+            sock = ssl.create_default_context().wrap_socket(sock, server_hostname=host)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.sock = sock
+        self.reader = sock.makefile("rb")
+        self._send_lock = threading.Lock()
+        self._handshake(host, port, parsed.path or "/")
+
+    def _handshake(self, host, port, path):
+        key = base64.b64encode(os.urandom(16)).decode()
+        request = (
+            f"GET {path} HTTP/1.1\r\n"
+            f"Host: {host}:{port}\r\n"
+            "Upgrade: websocket\r\n"
+            "Connection: Upgrade\r\n"
+            f"Sec-WebSocket-Key: {key}\r\n"
+            "Sec-WebSocket-Version: 13\r\n\r\n"
+        )
+        self.sock.sendall(request.encode())
+        status = self.reader.readline().decode("latin-1")
+        headers = {}
+        while True:
+            line = self.reader.readline().decode("latin-1").strip()
+            if not line:
+                break
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+        if " 101 " not in status or headers.get("sec-websocket-accept") != accept_key(
+            key
+        ):
+            raise ConnectionError(f"WebSocket handshake failed: {status.strip()}")
+
+    def send(self, text):
+        with self._send_lock:
+            self.sock.sendall(encode_frame(OP_TEXT, text.encode(), mask=True))
+
+    def recv(self):
+        # Наступне текстове повідомлення або None, якщо сервер закрив з'єднання
+        message = b""
+        while True:
+            fin, opcode, payload = read_frame(self.reader)
+            if opcode == OP_PING:
+                with self._send_lock:
+                    self.sock.sendall(encode_frame(OP_PONG, payload, mask=True))
+                continue
+            if opcode == OP_PONG:
+                continue
+            if opcode == OP_CLOSE:
+                return None
+            message += payload
+            if fin:
+                return message.decode()
+
+    def close(self):
+        try:
+            with self._send_lock:
+                self.sock.sendall(encode_frame(OP_CLOSE, b"", mask=True))
+        except OSError:
+            pass
+        self.sock.close()
+
+
+class KrakenStream:
+    # Фоновий потік з підписками на канал ohlc WebSocket API Kraken.
+    # Кожна оновлена свічка передається в on_candles(wsname, interval, rows),
+    # де rows - рядки у форматі відповіді REST /OHLC
+    def __init__(self, on_candles, url=KRAKEN_WS_URL, timeout=STREAM_TIMEOUT):
+        self.on_candles = on_candles
+        self.url = url
+        self.timeout = timeout
+        self.subscriptions = set()
+        self.connected = threading.Event()
+        self._conn = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        # Потік і з'єднання створюються лише з першою підпискою
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="kraken-stream", daemon=True
+                )
+                self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        with self._lock:
+            conn = self._conn
+        if conn is not None:
+            conn.close()
+
+    def subscribe(self, wsname, interval):
+        key = (wsname, int(interval))
+        with self._lock:
+            if key in self.subscriptions:
+                return
+            self.subscriptions.add(key)
+            conn = self._conn
+        if conn is not None:
+            try:
+                conn.send(self.subscribe_message(*key))
+            except OSError:
+                # Після перепідключення всі підписки відновлюються
+                pass
+        self.start()
+
+    def unsubscribe(self, wsname, interval):
+        key = (wsname, int(interval))
+        with self._lock:
+            if key not in self.subscriptions:
+                return
+            self.subscriptions.discard(key)
+            conn = self._conn
+        if conn is not None:
+            try:
+                conn.send(self.subscribe_message(*key, event="unsubscribe"))
+            except OSError:
+                # Після перепідключення підписка вже не відновиться
+                pass
+
+    def subscribe_message(self, wsname, interval, event="subscribe"):
+        return json.dumps(
+            {
+                "event": event,
+                "pair": [wsname],
+                "subscription": {"name": "ohlc", "interval": interval},
+            }
+        )
+
+    def _run(self):
+        delay = RECONNECT_DELAY
+        while not self._stop.is_set():
+            conn = None
+            try:
+                conn = WebSocketConnection(self.url, timeout=self.timeout)
+                with self._lock:
+                    self._conn = conn
+                    subscriptions = list(self.subscriptions)
+                for key in subscriptions:
+                    conn.send(self.subscribe_message(*key))
+                self.connected.set()
+                delay = RECONNECT_DELAY
+                while not self._stop.is_set():
+                    message = conn.recv()
+                    if message is None:
+                        break
+                    self.handle_message(json.loads(message))
+            except Exception as e:
+                if not self._stop.is_set():
+                    print(f"Kraken stream error: {e}")
+            finally:
+                self.connected.clear()
+                with self._lock:
+                    self._conn = None
+                if conn is not None:
+                    conn.close()
+            self._stop.wait(delay)
+            delay = min(MAX_RECONNECT_DELAY, delay * 2)
+
+    def handle_message(self, message):
+        # Дані каналу: [channelID, [time, etime, open, high, low, close, vwap,
+        # volume, count], "ohlc-<interval>", wsname]; події (heartbeat,
+        # subscriptionStatus) приходять словниками і пропускаються
+        if not isinstance(message, list) or len(message) < 4:
+            return
+        channel, wsname = message[-2], message[-1]
+        if not str(channel).startswith("ohlc-"):
+            return
+        interval = int(channel.split("-", 1)[1])
+        _, etime, *values = message[1]
+        # REST /OHLC позначає свічку часом початку, WebSocket - часом кінця
+        begin = int(float(etime)) - interval * 60
+        self.on_candles(wsname, interval, [[begin, *values]])
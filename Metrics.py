@@ -0,0 +1,205 @@
+import functools
+import json
+import logging
+import threading
+import time
+
+# Межі кошиків гістограм часу, секунди
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+trace_logger = logging.getLogger("dashboard.trace")
+
+
+def _label_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+def _format_labels(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ""
+    body = ",".join(
+        '{}="{}"'.format(k, str(v).replace("\\", "\\\\").replace('"', '\\"'))
+        for k, v in pairs
+    )
+    return "{" + body + "}"
+
+
+class Counter:
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help_text = help_text
+        self.values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self.values.items()):
+                lines.append(f"{self.name}{_format_labels(key)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help_text, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = tuple(buckets)
+        # labels -> [лічильники по кошиках, сума, кількість]
+        self.values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            state = self.values.get(key)
+            if state is None:
+                state = [[0] * len(self.buckets), 0.0, 0]
+                self.values[key] = state
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[0][i] += 1
+            state[1] += value
+            state[2] += 1
+
+    def render(self):
+        lines = [
+            f"# HELP {self.name} {self.help_text}",
+            f"# TYPE {self.name} histogram",
+        ]
+        with self._lock:
+            for key, (counts, total, count) in sorted(self.values.items()):
+                for bound, bucket_count in zip(self.buckets, counts):
+                    labels = _format_labels(key, [("le", bound)])
+                    lines.append(f"{self.name}_bucket{labels} {bucket_count}")
+                labels = _format_labels(key, [("le", "+Inf")])
+                lines.append(f"{self.name}_bucket{labels} {count}")
+                lines.append(f"{self.name}_sum{_format_labels(key)} {total}")
+                lines.append(f"{self.name}_count{_format_labels(key)} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    # Лічильники й гістограми у форматі Prometheus для маршруту /metrics
+    def __init__(self):
+        self.metrics = {}
+        self._lock = threading.Lock()
+
+    def _get(self, cls, name, help_text, **kwargs):
+        with self._lock:
+            metric = self.metrics.get(name)
+            if metric is None:
+                metric = cls(name, help_text, **kwargs)
+                self.metrics[name] = metric
+            return metric
+
+    def counter(self, name, help_text=""):
+        return self._get(Counter, name, help_text)
+
+    def histogram(self, name, help_text="", buckets=DEFAULT_BUCKETS):
+        return self._get(Histogram, name, help_text, buckets=buckets)
+
+    def render(self):
+        with self._lock:
+            metrics = list(self.metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+UPSTREAM_REQUESTS = REGISTRY.counter(
+    "upstream_requests_total", "Upstream HTTP requests by endpoint and status"
+)
+UPSTREAM_SECONDS = REGISTRY.histogram(
+    "upstream_request_seconds", "Upstream HTTP request latency including retries"
+)
+UPSTREAM_BYTES = REGISTRY.counter(
+    "upstream_response_bytes_total", "Upstream HTTP response body bytes"
+)
+UPSTREAM_RETRIES = REGISTRY.counter(
+    "upstream_retries_total", "Upstream HTTP request retries"
+)
+PARSE_SECONDS = REGISTRY.histogram(
+    "parse_seconds", "Time spent parsing upstream payloads into DataFrames"
+)
+FIGURE_SECONDS = REGISTRY.histogram(
+    "figure_build_seconds", "Time spent building Plotly figures"
+)
+CALLBACK_SECONDS = REGISTRY.histogram(
+    "callback_seconds", "Dash callback execution time"
+)
+CALLBACK_ERRORS = REGISTRY.counter(
+    "callback_errors_total", "Dash callbacks that raised an exception"
+)
+STALE_RESPONSES = REGISTRY.counter(
+    "stale_responses_total",
+    "Provider calls answered with the last good data after a timeout or failure",
+)
+
+
+def trace(event, **fields):
+    # Рядок JSON у журнал трасування, якщо його увімкнено (enable_trace)
+    if trace_logger.isEnabledFor(logging.INFO):
+        trace_logger.info(json.dumps(dict(fields, event=event), default=str))
+
+
+def enable_trace(path=None):
+    # Вмикає журнал трасування кожного запиту у файл path або в stderr
+    handler = logging.FileHandler(path) if path else logging.StreamHandler()
+    handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+    trace_logger.addHandler(handler)
+    trace_logger.setLevel(logging.INFO)
+    trace_logger.propagate = False
+
+
+def record_upstream(endpoint, status, latency, size, retries):
+    UPSTREAM_REQUESTS.inc(endpoint=endpoint, status=str(status))
+    UPSTREAM_SECONDS.observe(latency, endpoint=endpoint)
+    UPSTREAM_BYTES.inc(size, endpoint=endpoint)
+    if retries:
+        UPSTREAM_RETRIES.inc(retries, endpoint=endpoint)
+    trace(
+        "upstream",
+        endpoint=endpoint,
+        status=status,
+        latency=round(latency, 6),
+        bytes=size,
+        retries=retries,
+    )
+
+
+def record_rejected(endpoint, status):
+    # Запит, який не дійшов до upstream (відкритий запобіжник): лише лічильник,
+    # без нульової затримки в гістограмі
+    UPSTREAM_REQUESTS.inc(endpoint=endpoint, status=str(status))
+    trace("upstream", endpoint=endpoint, status=status)
+
+
+def timed(histogram, errors=None, **labels):
+    # Декоратор: час виконання функції в histogram, винятки в лічильник errors
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            except Exception:
+                if errors is not None:
+                    errors.inc(**labels)
+                raise
+            finally:
+                elapsed = time.perf_counter() - start
+                histogram.observe(elapsed, **labels)
+                trace(histogram.name, latency=round(elapsed, 6), **labels)
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,208 @@
+import json
+import os
+import re
+import threading
+from contextlib import contextmanager
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: блокування лише між потоками одного процесу
+    fcntl = None
+
+# pandas імпортується всередині методів, щоб не сповільнювати старт дашборда
+
+# Локальні дані дашборда і команди Backfill; сховище OHLC за замовчуванням
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+OHLC_STORE_DIR = os.path.join(DATA_DIR, "ohlc")
+
+# Формат запису однієї свічки на диску (фіксована ширина, 64 байти)
+CANDLE_DTYPE = np.dtype(
+    [
+        ("timestamp", "<i8"),
+        ("open", "<f8"),
+        ("high", "<f8"),
+        ("low", "<f8"),
+        ("close", "<f8"),
+        ("vwap", "<f8"),
+        ("volume", "<f8"),
+        ("count", "<i8"),
+    ]
+)
+
+
+class OHLCStore:
+    # Локальне сховище OHLC серій: один бінарний файл записів на (pair, interval)
+    # та json з кількістю зафіксованих рядків і курсором last.
+    # Дані дописуються в кінець, а метадані замінюються атомарно через os.replace,
+    # тож недописаний після збою хвіст просто ігнорується при читанні.
+    # Повний перезапис серії йде в новий файл даних, який називають метадані.
+    # Запис і читання блокують файл .lock каталогу, тож сховище можна ділити
+    # з окремим процесом (команда Backfill)
+    def __init__(self, directory):
+        self.directory = directory
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    @contextmanager
+    def _locked(self, exclusive=True):
+        with open(os.path.join(self.directory, ".lock"), "a") as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _paths(self, pair, interval):
+        name = re.sub(r"[^A-Za-z0-9_.-]", "_", f"{pair}_{int(interval)}")
+        base = os.path.join(self.directory, name)
+        return base + ".bin", base + ".json"
+
+    def _read_meta(self, meta_path):
+        try:
+            with open(meta_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_meta(self, meta_path, meta):
+        tmp_path = meta_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(meta, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, meta_path)
+
+    def _data_path(self, meta, default):
+        # Файл даних, названий у метаданих; у старих метаданих його немає
+        if meta and meta.get("data"):
+            return os.path.join(self.directory, meta["data"])
+        return default
+
+    def _rewrite(self, default_path, meta_path, meta, records, last):
+        # Серія записується в новий файл з наступною версією, метадані
+        # перемикаються на нього одним os.replace, після чого старий файл
+        # видаляється. До перемикання читачі бачать попередню серію повністю
+        version = (meta or {}).get("version", 0) + 1
+        new_path = f"{default_path[:-len('.bin')]}.{version}.bin"
+        with open(new_path, "wb") as f:
+            f.write(records.tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        self._write_meta(
+            meta_path,
+            {
+                "rows": len(records),
+                "last": int(last),
+                "data": os.path.basename(new_path),
+                "version": version,
+            },
+        )
+        old_path = self._data_path(meta, default_path)
+        if old_path != new_path and os.path.exists(old_path):
+            os.remove(old_path)
+
+    def _records(self, data_path, rows):
+        if rows == 0 or not os.path.exists(data_path):
+            return np.empty(0, dtype=CANDLE_DTYPE)
+        return np.memmap(data_path, dtype=CANDLE_DTYPE, mode="r", shape=(rows,))
+
+    def load(self, pair, interval, price_dtype="float64"):
+        # Повертає (DataFrame, last) або None, якщо серії ще немає на диску.
+        # Колонки мають ті самі типи, що й після KrakenDataProvider.parse_ohlc_data:
+        # ціни price_dtype, count int32
+        import pandas as pd
+
+        data_path, meta_path = self._paths(pair, interval)
+        with self._locked(exclusive=False):
+            meta = self._read_meta(meta_path)
+            if meta is None:
+                return None
+            data_path = self._data_path(meta, data_path)
+            records = np.array(self._records(data_path, meta["rows"]))
+
+        frame = {
+            "timestamp": records["timestamp"]
+            .astype("datetime64[s]")
+            .astype("datetime64[ns]")
+        }
+        for col in ["open", "high", "low", "close", "vwap"]:
+            frame[col] = records[col].astype(price_dtype)
+        frame["volume"] = records["volume"].astype("float64")
+        frame["count"] = records["count"].astype("int32")
+        return pd.DataFrame(frame, copy=False), meta["last"]
+
+    def append(self, pair, interval, df, last, gaps=False):
+        # Дописує нові свічки; записи з часом >= першої нової свічки перезаписуються,
+        # щоб незакрита свічка замінювалась, а не дублювалась. Якщо нові свічки
+        # починаються пізніше, ніж через interval після збережених (/OHLC після
+        # довгої паузи), серія переписується з нових свічок, як у merge_ohlc.
+        # gaps=True дозволяє пропуски (свічки з угод, де інтервали без угод відсутні)
+        default_path, meta_path = self._paths(pair, interval)
+        new = self._to_records(df)
+
+        with self._lock, self._locked():
+            meta = self._read_meta(meta_path) or {"rows": 0, "last": 0}
+            data_path = self._data_path(meta, default_path)
+            rows = meta["rows"]
+            if len(new):
+                stored = self._records(data_path, rows)
+                rows = int(np.searchsorted(stored["timestamp"], new["timestamp"][0]))
+                gap = (
+                    not gaps
+                    and rows > 0
+                    and new["timestamp"][0]
+                    > stored["timestamp"][rows - 1] + int(interval) * 60
+                )
+                del stored
+                if gap:
+                    self._rewrite(default_path, meta_path, meta, new, last)
+                    return
+
+                mode = "r+b" if os.path.exists(data_path) else "wb"
+                with open(data_path, mode) as f:
+                    f.seek(rows * CANDLE_DTYPE.itemsize)
+                    f.write(new.tobytes())
+                    rows += len(new)
+                    f.truncate(rows * CANDLE_DTYPE.itemsize)
+                    f.flush()
+                    os.fsync(f.fileno())
+
+            self._write_meta(meta_path, dict(meta, rows=rows, last=int(last)))
+
+    def prepend(self, pair, interval, df):
+        # Давніша історія (Backfill) перед наявними свічками серії; свічки,
+        # не раніші за першу наявну, відкидаються. Після збою серія
+        # залишається або старою, або повною новою (_rewrite)
+        data_path, meta_path = self._paths(pair, interval)
+        older = self._to_records(df)
+        with self._lock, self._locked():
+            meta = self._read_meta(meta_path)
+            rows = meta["rows"] if meta else 0
+            stored = np.array(self._records(self._data_path(meta, data_path), rows))
+            if len(stored):
+                older = older[older["timestamp"] < stored["timestamp"][0]]
+            if len(older) == 0:
+                return
+            records = np.concatenate([older, stored])
+            last = meta["last"] if meta else 0
+            self._rewrite(data_path, meta_path, meta, records, last)
+
+    def remove(self, pair, interval):
+        data_path, meta_path = self._paths(pair, interval)
+        with self._lock, self._locked():
+            meta = self._read_meta(meta_path)
+            for path in (meta_path, self._data_path(meta, data_path), data_path):
+                if os.path.exists(path):
+                    os.remove(path)
+
+    def _to_records(self, df):
+        records = np.empty(len(df), dtype=CANDLE_DTYPE)
+        records["timestamp"] = (
+            df["timestamp"].to_numpy(dtype="datetime64[s]").astype("<i8")
+        )
+        for col in ["open", "high", "low", "close", "vwap", "volume", "count"]:
+            records[col] = df[col].to_numpy()
+        return records
@@ -0,0 +1,77 @@
+import threading
+import time
+
+
+class RefreshSnapshot:
+    # Незмінний результат одного циклу оновлення
+    def __init__(self, version, data, built_at):
+        self.version = version
+        self.data = data
+        self.built_at = built_at
+
+
+class BackgroundRefresher:
+    # Фоновий потік, який оновлює дані за власним розкладом і публікує знімок.
+    # Колбеки лише читають останній знімок, тож навантаження на upstream
+    # не залежить від кількості відкритих вкладок
+    # retry - перша пауза між невдалими спробами, поки не опубліковано жодного
+    # знімка; далі подвоюється, але не довше interval
+    def __init__(self, build, interval=60, name="background-refresher", retry=None):
+        self.build = build
+        self.interval = interval
+        self.name = name
+        self.retry = retry
+        self.snapshot = None
+        self.version = 0
+        self._cond = threading.Condition()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        # Потік стартує ліниво, щоб процес-наглядач reloader'а не ходив в upstream
+        with self._cond:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name=self.name, daemon=True
+                )
+                self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+    def refresh_now(self):
+        # Позачергове оновлення (наприклад, по кнопці Refresh)
+        self.start()
+        self._wake.set()
+
+    def latest(self, min_version=0, timeout=None):
+        # Повертає останній знімок, за потреби чекаючи на версію min_version
+        self.start()
+        with self._cond:
+            self._cond.wait_for(lambda: self.version >= min_version, timeout)
+            return self.snapshot
+
+    def _run(self):
+        delay = self.retry
+        while not self._stop.is_set():
+            self._refresh_once()
+            wait = self.interval
+            if self.snapshot is None and delay:
+                wait = min(delay, self.interval)
+                delay *= 2
+            self._wake.wait(wait)
+            self._wake.clear()
+
+    def _refresh_once(self):
+        try:
+            data = self.build()
+        except Exception as e:
+            # Залишаємо попередній знімок, якщо оновлення не вдалося
+            print(f"Error refreshing data: {e}")
+            return
+        with self._cond:
+            self.version += 1
+            self.snapshot = RefreshSnapshot(self.version, data, time.time())
+            self._cond.notify_all()
@@ -0,0 +1,143 @@
+import os
+import pickle
+import sqlite3
+import threading
+import time
+import uuid
+
+# Скільки інший процес чекає на результат оновлення ключа, секунди;
+# після цього повертається застаріле значення
+WAIT_TIMEOUT = 30
+# Термін оренди ключа: якщо процес, що оновлює ключ, впав,
+# інший процес перехопить оновлення після цього часу, секунди
+LEASE_TTL = 60
+# Період опитування, поки ключ оновлює інший процес, секунди
+POLL_INTERVAL = 0.05
+
+
+class SharedCache:
+    # Спільний кеш для кількох процесів (воркерів gunicorn) у файлі SQLite.
+    # Кожен ключ оновлює рівно один процес, який отримав оренду (lease),
+    # решта чекають і читають його результат
+    def __init__(self, path, wait_timeout=WAIT_TIMEOUT, lease_ttl=LEASE_TTL):
+        self.path = path
+        self.wait_timeout = wait_timeout
+        self.lease_ttl = lease_ttl
+        # З'єднання SQLite не можна ділити між потоками
+        self._local = threading.local()
+        # Розпаковані значення: key -> (updated_at, value), щоб свіжий ключ
+        # не розпаковувався з pickle при кожному читанні
+        self._values = {}
+        self._values_lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries "
+                "(key TEXT PRIMARY KEY, value BLOB, updated_at REAL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS leases "
+                "(key TEXT PRIMARY KEY, owner TEXT, expires_at REAL)"
+            )
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.wait_timeout)
+            # WAL: читачі не блокують запис і навпаки
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def updated_at(self, key):
+        row = (
+            self._connection()
+            .execute("SELECT updated_at FROM entries WHERE key = ?", (key,))
+            .fetchone()
+        )
+        return None if row is None else row[0]
+
+    def get(self, key):
+        # (значення, час оновлення) або None, якщо ключа ще немає
+        updated_at = self.updated_at(key)
+        if updated_at is None:
+            return None
+        with self._values_lock:
+            cached = self._values.get(key)
+        if cached is not None and cached[0] == updated_at:
+            return cached[1], updated_at
+        row = (
+            self._connection()
+            .execute("SELECT value, updated_at FROM entries WHERE key = ?", (key,))
+            .fetchone()
+        )
+        if row is None:
+            return None
+        value = pickle.loads(row[0])
+        with self._values_lock:
+            self._values[key] = (row[1], value)
+        return value, row[1]
+
+    def set(self, key, value):
+        updated_at = time.time()
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        with self._connection() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO entries (key, value, updated_at) VALUES (?, ?, ?)",
+                (key, blob, updated_at),
+            )
+        with self._values_lock:
+            self._values[key] = (updated_at, value)
+
+    def _acquire(self, key):
+        # Оренда ключа між процесами: одна атомарна вставка, яка вдається,
+        # лише якщо оренди немає або її термін минув. Повертає власника або None
+        owner = uuid.uuid4().hex
+        now = time.time()
+        with self._connection() as conn:
+            cursor = conn.execute(
+                "INSERT INTO leases (key, owner, expires_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET owner = excluded.owner, "
+                "expires_at = excluded.expires_at WHERE leases.expires_at < ?",
+                (key, owner, now + self.lease_ttl, now),
+            )
+        return owner if cursor.rowcount == 1 else None
+
+    def _release(self, key, owner):
+        with self._connection() as conn:
+            conn.execute("DELETE FROM leases WHERE key = ? AND owner = ?", (key, owner))
+
+    def get_or_refresh(self, key, max_age, build):
+        # Значення ключа не старше max_age секунд. build(previous) отримує
+        # попереднє значення (або None) і повертає нове; None означає помилку,
+        # тоді залишається попереднє значення
+        entry = self.get(key)
+        if entry is not None and time.time() - entry[1] < max_age:
+            return entry[0]
+
+        deadline = time.monotonic() + self.wait_timeout
+        while True:
+            owner = self._acquire(key)
+            if owner is not None:
+                try:
+                    # Поки ми чекали на оренду, ключ міг оновити інший процес
+                    entry = self.get(key)
+                    if entry is not None and time.time() - entry[1] < max_age:
+                        return entry[0]
+                    value = build(None if entry is None else entry[0])
+                    if value is None:
+                        return None if entry is None else entry[0]
+                    self.set(key, value)
+                    return value
+                finally:
+                    self._release(key, owner)
+
+            # Ключ оновлює інший процес: чекаємо на його результат
+            time.sleep(POLL_INTERVAL)
+            updated_at = self.updated_at(key)
+            if updated_at is not None and time.time() - updated_at < max_age:
+                return self.get(key)[0]
+            if time.monotonic() > deadline:
+                entry = self.get(key)
+                return None if entry is None else entry[0]
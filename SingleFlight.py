@@ -0,0 +1,62 @@
+import threading
+from concurrent.futures import Future
+from Metrics import REGISTRY
+
+COALESCED_CALLS = REGISTRY.counter(
+    "singleflight_coalesced_total",
+    "Calls that waited for an identical in-flight upstream fetch",
+)
+
+
+class SingleFlight:
+    # Об'єднує одночасні виклики з однаковим ключем: перший виконує fn,
+    # решта чекають і отримують той самий результат (або той самий виняток)
+    def __init__(self, name):
+        self.name = name
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn, timeout=None):
+        # timeout - бюджет очікування, секунди: fn тоді виконується у фоновому
+        # потоці й завершується навіть після concurrent.futures.TimeoutError
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._calls[key] = future
+        if not leader:
+            COALESCED_CALLS.inc(flight=self.name)
+        elif timeout is None:
+            self._run(key, future, fn)
+        else:
+            threading.Thread(
+                target=self._run,
+                args=(key, future, fn),
+                name=f"{self.name}-flight",
+                daemon=True,
+            ).start()
+        return future.result(timeout)
+
+    def _run(self, key, future, fn):
+        try:
+            future.set_result(fn())
+        except BaseException as e:
+            future.set_exception(e)
+        finally:
+            # Наступний виклик після завершення знову йде в upstream
+            with self._lock:
+                del self._calls[key]
+
+
+def mark_stale(df, since):
+    # Остання вдала відповідь, віддана замість свіжої: неглибока копія
+    # з часом (time.time()), коли дані були актуальні
+    stale = df.copy(deep=False)
+    stale.attrs["stale_since"] = since
+    return stale
+
+
+def stale_since(df):
+    # Час актуальності застарілих даних або None для свіжих
+    return None if df is None else df.attrs.get("stale_since")
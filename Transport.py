@@ -0,0 +1,208 @@
+import random
+import re
+import threading
+import time
+import requests
+from urllib.parse import urlparse
+from requests.adapters import HTTPAdapter
+from Metrics import record_rejected, record_upstream
+
+try:
+    import brotli  # noqa: F401
+
+    ACCEPT_ENCODING = "gzip, deflate, br"
+except ImportError:
+    ACCEPT_ENCODING = "gzip, deflate"
+
+# Ліміти запитів для хостів: (запитів за секунду, максимальний сплеск)
+DEFAULT_RATE_LIMITS = {
+    "api.kraken.com": (1, 5),
+    "api.coincap.io": (3, 10),
+}
+# Таймаут запиту за замовчуванням, секунди
+DEFAULT_TIMEOUT = 10
+# Коди відповіді, після яких запит повторюється
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+# Скільки невдалих запитів поспіль до endpoint відкривають запобіжник
+# і скільки секунд запити до нього після цього не виконуються
+BREAKER_FAILURES = 5
+BREAKER_COOLDOWN = 30
+
+
+class CircuitOpenError(requests.ConnectionError):
+    # Запит не виконувався: запобіжник endpoint відкритий після серії невдач
+    pass
+
+
+def endpoint_label(url):
+    # Мітка для метрик: хост і шлях без ідентифікаторів активів
+    parsed = urlparse(url)
+    path = re.sub(r"/assets/[^/]+/history$", "/assets/{id}/history", parsed.path)
+    return f"{parsed.hostname}{path}"
+
+
+class TokenBucket:
+    # Token bucket з резервуванням: кожен виклик забирає токен і, якщо токенів
+    # немає, чекає рівно стільки, скільки потрібно для його накопичення
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(
+                self.capacity, self.tokens + (now - self.updated) * self.rate
+            )
+            self.updated = now
+            self.tokens -= 1
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0
+        if wait > 0:
+            time.sleep(wait)
+
+
+class CircuitBreaker:
+    # Після failure_threshold невдач поспіль endpoint вважається недоступним
+    # на cooldown секунд; потім один пробний запит вирішує, чи закрити запобіжник
+    def __init__(self, failure_threshold=BREAKER_FAILURES, cooldown=BREAKER_COOLDOWN):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if self.probing or time.monotonic() - self.opened_at < self.cooldown:
+                return False
+            self.probing = True
+            return True
+
+    def record(self, success):
+        with self._lock:
+            self.probing = False
+            if success:
+                self.failures = 0
+                self.opened_at = None
+                return
+            self.failures += 1
+            if self.failures >= self.failure_threshold or self.opened_at is not None:
+                self.opened_at = time.monotonic()
+
+
+class HttpTransport:
+    # Спільний HTTP транспорт для KrakenDataProvider і CoinCapProvider:
+    # пул keep-alive з'єднань, ліміт запитів на хост, таймаути та повтори
+    # з випадковою затримкою на 429/5xx
+    def __init__(
+        self,
+        rate_limits=None,
+        timeout=DEFAULT_TIMEOUT,
+        max_retries=3,
+        backoff=0.5,
+        max_backoff=10,
+        pool_size=16,
+        breaker_failures=BREAKER_FAILURES,
+        breaker_cooldown=BREAKER_COOLDOWN,
+    ):
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.rate_limits = dict(
+            DEFAULT_RATE_LIMITS if rate_limits is None else rate_limits
+        )
+        self._buckets = {}
+        self._buckets_lock = threading.Lock()
+        self.breaker_failures = breaker_failures
+        self.breaker_cooldown = breaker_cooldown
+        self._breakers = {}
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers["Accept-Encoding"] = ACCEPT_ENCODING
+
+    def _bucket(self, host):
+        with self._buckets_lock:
+            bucket = self._buckets.get(host)
+            if bucket is None and host in self.rate_limits:
+                bucket = TokenBucket(*self.rate_limits[host])
+                self._buckets[host] = bucket
+            return bucket
+
+    def _breaker(self, endpoint):
+        with self._buckets_lock:
+            breaker = self._breakers.get(endpoint)
+            if breaker is None:
+                breaker = CircuitBreaker(self.breaker_failures, self.breaker_cooldown)
+                self._breakers[endpoint] = breaker
+            return breaker
+
+    def _retry_delay(self, attempt, response=None):
+        # Retry-After від сервера має пріоритет над експоненційною затримкою
+        if response is not None:
+            retry_after = response.headers.get("Retry-After")
+            if retry_after and retry_after.isdigit():
+                return min(self.max_backoff, int(retry_after))
+        delay = min(self.max_backoff, self.backoff * 2**attempt)
+        return delay * random.uniform(0.5, 1.5)
+
+    def get(self, url, params=None, timeout=None):
+        # Повертає останню відповідь; статус перевіряє викликач, як і з requests.get
+        bucket = self._bucket(urlparse(url).hostname)
+        endpoint = endpoint_label(url)
+        breaker = self._breaker(endpoint)
+        if not breaker.allow():
+            record_rejected(endpoint, "circuit_open")
+            raise CircuitOpenError(f"Circuit open for {endpoint}")
+        start = time.perf_counter()
+        attempt = 0
+        while True:
+            if bucket is not None:
+                bucket.acquire()
+            try:
+                response = self.session.get(
+                    url, params=params, timeout=timeout or self.timeout
+                )
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt >= self.max_retries:
+                    breaker.record(False)
+                    record_upstream(
+                        endpoint, "error", time.perf_counter() - start, 0, attempt
+                    )
+                    raise
+                time.sleep(self._retry_delay(attempt))
+                attempt += 1
+                continue
+            except Exception:
+                # Інші помилки (ChunkedEncodingError, ContentDecodingError, ...)
+                # без повторів, але теж рахуються, інакше пробний запит
+                # залишив би запобіжник відкритим назавжди
+                breaker.record(False)
+                record_upstream(
+                    endpoint, "error", time.perf_counter() - start, 0, attempt
+                )
+                raise
+
+            if response.status_code not in RETRY_STATUSES or (
+                attempt >= self.max_retries
+            ):
+                breaker.record(response.status_code not in RETRY_STATUSES)
+                record_upstream(
+                    endpoint,
+                    response.status_code,
+                    time.perf_counter() - start,
+                    len(response.content),
+                    attempt,
+                )
+                return response
+            time.sleep(self._retry_delay(attempt, response))
+            attempt += 1
@@ -0,0 +1,108 @@
+// Графік ціни в браузері: перемикання символу й періоду та zoom/pan
+// без запиту до сервера, якщо потрібні дані вже є (колбеки з main.py)
+(function () {
+    // Межа діапазону осі X як мітка часу; дата без часу - північ, як у plotly
+    function toTime(value) {
+        const text = String(value).replace(" ", "T");
+        return Date.parse(text.length === 10 ? text + "T00:00:00" : text);
+    }
+
+    // Видимий діапазон осі X з relayoutData: [start, end], [null, null] після
+    // скидання масштабу або undefined, якщо діапазон осі X не змінювався
+    function relayoutRange(data) {
+        if (!data) {
+            return undefined;
+        }
+        for (const axis of ["xaxis", "xaxis2", "xaxis3"]) {
+            if (data[axis + ".range[0]"] !== undefined) {
+                return [data[axis + ".range[0]"], data[axis + ".range[1]"]];
+            }
+            if (data[axis + ".range"]) {
+                return data[axis + ".range"].slice(0, 2);
+            }
+            if (data[axis + ".autorange"]) {
+                return [null, null];
+            }
+        }
+        return undefined;
+    }
+
+    // Ключ фігури в кеші: символ, період і вибрані індикатори (як meta.chart)
+    function chartKey(symbol, period, indicators) {
+        return [symbol, period, (indicators || []).slice().sort().join(",")].join("|");
+    }
+
+    window.dash_clientside = Object.assign({}, window.dash_clientside, {
+        line_chart: {
+            // Виходи: figure, key, stream, stream-interval.disabled, request
+            select: function (symbol, period, relayoutData, indicators, cache, figure) {
+                const noUpdate = window.dash_clientside.no_update;
+                const triggered = window.dash_clientside.callback_context.triggered.map(
+                    (t) => t.prop_id
+                );
+                const request = { symbol: symbol, period: period, at: Date.now() };
+
+                if (triggered.includes("line-chart.relayoutData")) {
+                    const range = relayoutRange(relayoutData);
+                    if (range === undefined) {
+                        return [noUpdate, noUpdate, noUpdate, noUpdate, noUpdate];
+                    }
+                    // Zoom усередині вікна з повною деталізацією plotly вже
+                    // показав сам; потік вимикається, як і після запиту до сервера
+                    const meta = figure && figure.layout && figure.layout.meta;
+                    if (
+                        range[0] !== null &&
+                        meta &&
+                        meta.exact &&
+                        toTime(range[0]) >= toTime(meta.detail[0]) &&
+                        toTime(range[1]) <= toTime(meta.detail[1])
+                    ) {
+                        return [noUpdate, noUpdate, null, true, noUpdate];
+                    }
+                    request.range = range;
+                    return [noUpdate, noUpdate, noUpdate, noUpdate, request];
+                }
+
+                const entry = cache && cache.entries[chartKey(symbol, period, indicators)];
+                if (!entry) {
+                    return [noUpdate, noUpdate, noUpdate, noUpdate, request];
+                }
+                // Збережена фігура показується одразу; застаріла ще й
+                // перевіряється на сервері, який відповідає лише за змін
+                const fresh = Date.now() - entry.at < cache.max_age;
+                return [
+                    entry.figure,
+                    entry.key,
+                    entry.stream,
+                    !entry.stream,
+                    fresh ? noUpdate : request,
+                ];
+            },
+
+            // Кожна нова фігура стандартного вікна (від сервера або з потоку)
+            // запам'ятовується разом з ключем і станом потоку
+            store: function (figure, key, stream, cache) {
+                const meta = figure && figure.layout && figure.layout.meta;
+                if (!meta || !meta.chart) {
+                    return window.dash_clientside.no_update;
+                }
+                const entries = Object.assign({}, cache.entries);
+                const previous = entries[meta.chart];
+                // Фігура, щойно відновлена з кешу, не стає свіжішою
+                const restored = previous && key !== null && previous.key === key;
+                delete entries[meta.chart];
+                entries[meta.chart] = {
+                    figure: figure,
+                    key: key,
+                    stream: stream,
+                    at: restored ? previous.at : Date.now(),
+                };
+                const names = Object.keys(entries);
+                while (names.length > cache.size) {
+                    delete entries[names.shift()];
+                }
+                return Object.assign({}, cache, { entries: entries });
+            },
+        },
+    });
+})();
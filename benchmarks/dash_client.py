@@ -0,0 +1,54 @@
+import json
+
+
+class DashCallbackClient:
+    # Викликає колбеки Dash через /_dash-update-component так само, як браузер,
+    # але через тестовий клієнт Flask або будь-яку функцію post(url, json)
+    def __init__(self, app, post=None):
+        self.app = app
+        if post is None:
+            client = app.server.test_client()
+
+            def post(path, payload):
+                return client.post(path, json=payload)
+
+        self.post = post
+
+    def find(self, output):
+        # Ключ серверного колбека в callback_map за одним з його виходів
+        # ("line-chart.figure"); суфікс allow_duplicate (@hash) не враховується,
+        # клієнтські колбеки пропускаються
+        for key, spec in self.app.callback_map.items():
+            outputs = [o.split("@")[0] for o in key.strip(".").split("...")]
+            if output in outputs and "callback" in spec:
+                return key
+        raise KeyError(output)
+
+    def payload(self, output, inputs, state=None, changed=None):
+        # inputs/state - значення у порядку оголошення колбека
+        key = self.find(output)
+        spec = self.app.callback_map[key]
+        outputs = [
+            {"id": o.rsplit(".", 1)[0], "property": o.rsplit(".", 1)[1]}
+            for o in key.strip(".").split("...")
+        ]
+        return {
+            "output": key,
+            "outputs": outputs if len(outputs) > 1 else outputs[0],
+            "inputs": [dict(i, value=v) for i, v in zip(spec["inputs"], inputs)],
+            "state": [dict(s, value=v) for s, v in zip(spec["state"], state or [])],
+            "changedPropIds": list(changed or []),
+        }
+
+    def call(self, output, inputs, state=None, changed=None):
+        # Повертає (HTTP статус, розібрана відповідь або None, якщо не 200)
+        response = self.post(
+            "/_dash-update-component", self.payload(output, inputs, state, changed)
+        )
+        status = response.status_code
+        if status != 200:
+            return status, None
+        body = (
+            response.get_data() if hasattr(response, "get_data") else response.content
+        )
+        return status, json.loads(body)
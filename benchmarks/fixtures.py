@@ -0,0 +1,155 @@
+import json
+import math
+import os
+import random
+import time
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+KRAKEN_URL = "https://api.kraken.com/0/public"
+COINCAP_URL = "https://api.coincap.io/v2"
+
+# Що записує --record і що синтезується, якщо записаної фікстури немає
+RECORD_PAIRS = ["XXBTZUSD", "XETHZUSD"]
+RECORD_INTERVALS = [15, 30, 60, 240, 1440, 10080, 21600]
+# Kraken повертає не більше 720 свічок на запит /OHLC
+OHLC_MAX_CANDLES = 720
+# Синтетичні угоди /Trades: одна угода кожні TRADE_STEP секунд
+TRADE_STEP = 60
+
+
+def fixture_path(name, fixtures_dir=FIXTURES_DIR):
+    safe = "".join(c if c.isalnum() or c in "_-." else "_" for c in name)
+    return os.path.join(fixtures_dir, safe + ".json")
+
+
+def load_fixture(name, fixtures_dir=FIXTURES_DIR):
+    # Записана відповідь або None, якщо її немає
+    try:
+        with open(fixture_path(name, fixtures_dir)) as f:
+            return json.load(f)
+    except OSError:
+        return None
+
+
+def save_fixture(name, payload, fixtures_dir=FIXTURES_DIR):
+    os.makedirs(fixtures_dir, exist_ok=True)
+    with open(fixture_path(name, fixtures_dir), "w") as f:
+        json.dump(payload, f)
+
+
+def synthetic_asset_pairs():
+    pairs = {}
+    for base in ["XXBT", "XETH", "XXRP", "XLTC", "ADA", "SOL", "DOT", "XXLM"]:
+        key = f"{base}ZUSD" if base.startswith("X") else f"{base}USD"
+        pairs[key] = {"altname": key, "wsname": f"{base}/USD", "base": base}
+        pairs[f"{base}EUR"] = {"altname": f"{base}EUR", "base": base}
+    return {"error": [], "result": pairs}
+
+
+def synthetic_ohlc(pair, interval):
+    # Детермінований випадковий ряд з OHLC_MAX_CANDLES свічок до поточного часу
+    rng = random.Random(f"{pair}-{interval}")
+    step = int(interval) * 60
+    end = int(time.time()) // step * step
+    price = rng.uniform(1, 50_000)
+    rows = []
+    for i in range(OHLC_MAX_CANDLES):
+        ts = end - (OHLC_MAX_CANDLES - 1 - i) * step
+        open_ = price
+        price = max(0.01, price * (1 + rng.gauss(0, 0.01)))
+        high = max(open_, price) * (1 + rng.random() * 0.005)
+        low = min(open_, price) * (1 - rng.random() * 0.005)
+        vwap = (open_ + price + high + low) / 4
+        volume = rng.uniform(0, 500)
+        rows.append(
+            [
+                ts,
+                f"{open_:.5f}",
+                f"{high:.5f}",
+                f"{low:.5f}",
+                f"{price:.5f}",
+                f"{vwap:.5f}",
+                f"{volume:.8f}",
+                rng.randint(1, 5000),
+            ]
+        )
+    return {"error": [], "result": {pair: rows, "last": rows[-2][0]}}
+
+
+def synthetic_assets(limit=250):
+    rng = random.Random("assets")
+    data = []
+    market_cap = 1.2e12
+    for i in range(limit):
+        price = rng.uniform(0.01, 60_000) / (i + 1)
+        data.append(
+            {
+                "id": f"asset-{i}",
+                "rank": str(i + 1),
+                "symbol": f"A{i}",
+                "name": f"Asset {i}",
+                "supply": str(market_cap / price),
+                "maxSupply": None,
+                "marketCapUsd": str(market_cap),
+                "volumeUsd24Hr": str(market_cap * rng.uniform(0.01, 0.2)),
+                "priceUsd": str(price),
+                "changePercent24Hr": str(rng.gauss(0, 4)),
+                "vwap24Hr": str(price),
+            }
+        )
+        market_cap *= rng.uniform(0.5, 0.95)
+    return {"data": data, "timestamp": int(time.time() * 1000)}
+
+
+def synthetic_trades(pair, since, count=1000):
+    # Сторінка угод після курсора since (наносекунди). Ціна залежить лише від
+    # часу угоди, тож сторінки узгоджені між собою незалежно від курсора
+    base = random.Random(pair).uniform(1, 50_000)
+    first = int(since) // 10**9 // TRADE_STEP * TRADE_STEP + TRADE_STEP
+    end = int(time.time())
+    rows = []
+    for ts in range(first, end, TRADE_STEP)[:count]:
+        rng = random.Random(f"{pair}-{ts}")
+        price = base * (1 + 0.2 * math.sin(ts / 86_400)) * (1 + rng.gauss(0, 0.002))
+        rows.append([f"{price:.5f}", f"{rng.uniform(0, 2):.8f}", ts, "b", "l", "", ts])
+    last = rows[-1][2] * 10**9 if rows else int(since)
+    return {"error": [], "result": {pair: rows, "last": str(last)}}
+
+
+def synthetic_history(asset_id, days=365):
+    rng = random.Random(asset_id)
+    day = 86_400_000
+    end = int(time.time() * 1000) // day * day
+    price = rng.uniform(0.01, 60_000)
+    data = []
+    for i in range(days):
+        ts = end - (days - 1 - i) * day
+        price = max(1e-6, price * (1 + rng.gauss(0, 0.03)))
+        data.append({"priceUsd": str(price), "time": ts, "date": ""})
+    return {"data": data, "timestamp": end}
+
+
+def record_fixtures(transport, fixtures_dir=FIXTURES_DIR, history_assets=10):
+    # Записує реальні відповіді Kraken і CoinCap для подальшого офлайн відтворення
+    payload = transport.get(f"{KRAKEN_URL}/AssetPairs").json()
+    save_fixture("kraken_AssetPairs", payload, fixtures_dir)
+
+    since = int(time.time()) - 365 * 10 * 86400
+    for pair in RECORD_PAIRS:
+        for interval in RECORD_INTERVALS:
+            params = {"pair": pair, "interval": interval, "since": since}
+            payload = transport.get(f"{KRAKEN_URL}/OHLC", params=params).json()
+            save_fixture(f"kraken_OHLC_{pair}_{interval}", payload, fixtures_dir)
+
+    assets = transport.get(f"{COINCAP_URL}/assets", params={"limit": 250}).json()
+    save_fixture("coincap_assets", assets, fixtures_dir)
+
+    end = int(time.time() * 1000)
+    start = end - 365 * 86_400_000
+    for asset in assets["data"][:history_assets]:
+        payload = transport.get(
+            f"{COINCAP_URL}/assets/{asset['id']}/history",
+            params={"interval": "d1", "start": start, "end": end},
+        ).json()
+        save_fixture(f"coincap_history_{asset['id']}", payload, fixtures_dir)
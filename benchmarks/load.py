@@ -0,0 +1,296 @@
+import argparse
+import json
+import logging
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+import numpy as np
+import requests
+from werkzeug.serving import make_server
+
+from benchmarks.dash_client import DashCallbackClient
+from benchmarks.fixtures import FIXTURES_DIR
+from benchmarks.run import git_revision
+from benchmarks.stub_server import StubApiServer
+from CoinAPI import CoinCapProvider
+from KrakenAPI import KrakenDataProvider
+from main import PERIOD_VALUES, CombinedDashboard
+from Transport import HttpTransport
+
+# Кількість одночасних сесій браузера на кожному кроці навантаження
+LOAD_USERS = [1, 5, 10, 20]
+# Тривалість кроку, секунди
+LOAD_DURATION = 10
+# Пауза сесії між діями, секунди (0 - максимальне навантаження)
+LOAD_THINK_TIME = 0.2
+# Частка дій сесії: тик interval-component, зміна символу/періоду, Refresh
+LOAD_ACTIONS = {"tick": 0.6, "change": 0.3, "refresh": 0.1}
+
+
+def percentiles(latencies):
+    # p50/p95/p99 у мілісекундах
+    values = np.percentile(latencies, [50, 95, 99])
+    return {f"p{p}_ms": round(float(v), 3) for p, v in zip([50, 95, 99], values)}
+
+
+class BrowserSession:
+    # Одна вкладка браузера: викликає колбеки дашборда через
+    # /_dash-update-component і зберігає ключі, які вже має клієнт
+    def __init__(self, base_url, app, symbols, seed):
+        self.http = requests.Session()
+        self.client = DashCallbackClient(
+            app,
+            post=lambda path, payload: self.http.post(base_url + path, json=payload),
+        )
+        self.symbols = symbols
+        self.random = random.Random(seed)
+        self.symbol = symbols[0]
+        self.period = "1d"
+        self.n_intervals = 0
+        self.n_clicks = None
+        self.market_keys = None
+        self.changes_keys = None
+        self.line_key = None
+
+    def call(self, name, output, inputs, state, changed, results):
+        start = time.perf_counter()
+        try:
+            status, body = self.client.call(output, inputs, state, changed)
+        except requests.RequestException:
+            status, body = None, None
+        results.append((name, (time.perf_counter() - start) * 1000, status))
+        if body is None:
+            return {}
+        # no_update не потрапляє у відповідь, тож ключі лишаються попередніми
+        return body.get("response", {})
+
+    def update_market(self, changed, results):
+        response = self.call(
+            "update_market_data",
+            "market-cap-pie.figure",
+            [self.n_clicks, self.n_intervals, 0],
+            [self.market_keys],
+            [changed],
+            results,
+        )
+        self.market_keys = response.get("market-data-keys", {}).get(
+            "data", self.market_keys
+        )
+
+    def update_changes(self, changed, results):
+        response = self.call(
+            "update_changes_data",
+            "changes-chart.figure",
+            [self.n_clicks, self.n_intervals, 0],
+            [self.changes_keys],
+            [changed],
+            results,
+        )
+        self.changes_keys = response.get("changes-data-keys", {}).get(
+            "data", self.changes_keys
+        )
+
+    def update_line_chart(self, request, changed, results):
+        # Запит, який клієнтський колбек надсилає для відсутньої фігури
+        response = self.call(
+            "update_line_chart",
+            "stream-interval.disabled",
+            [request, self.n_clicks, []],
+            [self.symbol, self.period, self.line_key],
+            [changed],
+            results,
+        )
+        self.line_key = response.get("line-chart-key", {}).get("data", self.line_key)
+
+    def open(self, results):
+        # Перше завантаження сторінки
+        self.update_market("interval-component.n_intervals", results)
+        self.update_changes("interval-component.n_intervals", results)
+        self.update_line_chart(
+            {"symbol": self.symbol, "period": self.period},
+            "line-chart-request.data",
+            results,
+        )
+
+    def step(self, results):
+        action = self.random.choices(
+            list(LOAD_ACTIONS), weights=list(LOAD_ACTIONS.values())
+        )[0]
+        if action == "tick":
+            self.n_intervals += 1
+            self.update_market("interval-component.n_intervals", results)
+            self.update_changes("interval-component.n_intervals", results)
+            self.call(
+                "update_symbol_options",
+                "symbol.options",
+                [self.n_intervals],
+                [self.symbols],
+                ["interval-component.n_intervals"],
+                results,
+            )
+        elif action == "change":
+            self.symbol = self.random.choice(self.symbols)
+            self.period = self.random.choice(list(PERIOD_VALUES))
+            self.update_line_chart(
+                {"symbol": self.symbol, "period": self.period},
+                "line-chart-request.data",
+                results,
+            )
+        else:
+            self.n_clicks = (self.n_clicks or 0) + 1
+            self.update_market("refresh-button.n_clicks", results)
+            self.update_changes("refresh-button.n_clicks", results)
+            self.update_line_chart(None, "refresh-button.n_clicks", results)
+
+
+class LoadTest:
+    # Дашборд з провайдерами на StubApiServer у справжньому багатопотоковому
+    # HTTP сервері; кожен крок запускає users сесій на duration секунд
+    def __init__(self, server, think_time=LOAD_THINK_TIME, seed=0):
+        self.server = server
+        self.think_time = think_time
+        self.seed = seed
+        transport = HttpTransport(rate_limits={})
+        kraken = KrakenDataProvider(transport=transport)
+        kraken.base_url = server.kraken_url
+        kraken.ws_url = None
+        coin_cap = CoinCapProvider(transport=transport)
+        coin_cap.base_url = server.coincap_url
+        self.dashboard = CombinedDashboard(
+            coin_cap=coin_cap,
+            kraken=kraken,
+            pairs_cache_file=None,
+        )
+        self.http = make_server(
+            "127.0.0.1", 0, self.dashboard.app.server, threaded=True
+        )
+        self.base_url = f"http://127.0.0.1:{self.http.server_port}"
+        self._thread = threading.Thread(
+            target=self.http.serve_forever, name="load-dash", daemon=True
+        )
+
+    def __enter__(self):
+        self._thread.start()
+        # Список пар потрібен сесіям для зміни символу; колбеки не чекають на
+        # перші знімки, тож без них сесії міряли б порожні відповіді
+        self.dashboard.pairs_refresher.latest(1, 30)
+        self.dashboard.refresher.latest(1, 30)
+        self.dashboard.changes_refresher.latest(1, 60)
+        return self
+
+    def __exit__(self, *exc):
+        self.http.shutdown()
+        self.dashboard.refresher.stop()
+        self.dashboard.changes_refresher.stop()
+        self.dashboard.pairs_refresher.stop()
+
+    def run_level(self, users, duration):
+        symbols = sorted(self.dashboard.symbol_ticker)
+        results = []
+        stop = threading.Event()
+
+        def session(number):
+            browser = BrowserSession(
+                self.base_url, self.dashboard.app, symbols, self.seed + number
+            )
+            local = []
+            browser.open(local)
+            while not stop.is_set():
+                browser.step(local)
+                if self.think_time:
+                    stop.wait(self.think_time)
+            results.extend(local)
+
+        threads = [
+            threading.Thread(target=session, args=(i,), daemon=True)
+            for i in range(users)
+        ]
+        upstream = Counter(self.server.endpoints)
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        time.sleep(duration)
+        stop.set()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+        upstream = Counter(self.server.endpoints) - upstream
+
+        callbacks = {}
+        for name in sorted({r[0] for r in results}):
+            latencies = [r[1] for r in results if r[0] == name]
+            # 204 - колбек не змінив жодного виходу (PreventUpdate)
+            errors = sum(1 for r in results if r[0] == name and r[2] not in (200, 204))
+            callbacks[name] = dict(
+                calls=len(latencies), errors=errors, **percentiles(latencies)
+            )
+        return {
+            "users": users,
+            "elapsed_s": round(elapsed, 3),
+            "calls": len(results),
+            "throughput_rps": round(len(results) / elapsed, 2),
+            "errors": sum(c["errors"] for c in callbacks.values()),
+            # Запити до stub API за ендпоінтом: обхід історій для змін цін
+            # не має рости з кількістю сесій
+            "upstream_requests": dict(sorted(upstream.items())),
+            "callbacks": callbacks,
+        }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Навантажувальний тест колбеків дашборда з N одночасними сесіями"
+    )
+    parser.add_argument("--users", type=int, nargs="+", default=LOAD_USERS)
+    parser.add_argument("--duration", type=float, default=LOAD_DURATION)
+    parser.add_argument(
+        "--think", type=float, default=LOAD_THINK_TIME, help="пауза між діями, с"
+    )
+    parser.add_argument(
+        "--latency", type=float, default=0.0, help="затримка stub сервера, секунди"
+    )
+    parser.add_argument("--fixtures", default=FIXTURES_DIR)
+    parser.add_argument("--output", default="load_results.json")
+    args = parser.parse_args(argv)
+    # Журнал кожного запиту werkzeug лише заважає таблиці результатів
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+
+    levels = []
+    with StubApiServer(args.fixtures, latency=args.latency) as server:
+        with LoadTest(server, think_time=args.think) as load:
+            for users in args.users:
+                level = load.run_level(users, args.duration)
+                levels.append(level)
+                print(
+                    f"{users:4d} users  {level['throughput_rps']:8.2f} calls/s  "
+                    f"{level['errors']} errors"
+                )
+                for endpoint, count in level["upstream_requests"].items():
+                    print(f"      {endpoint:25s} {count:6d} upstream requests")
+                for name, stats in level["callbacks"].items():
+                    print(
+                        f"      {name:25s} p50 {stats['p50_ms']:9.1f}  "
+                        f"p95 {stats['p95_ms']:9.1f}  p99 {stats['p99_ms']:9.1f} ms"
+                    )
+
+    results = {
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "revision": git_revision(),
+        "duration": args.duration,
+        "think_time": args.think,
+        "latency": args.latency,
+        "levels": levels,
+    }
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {os.path.abspath(args.output)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
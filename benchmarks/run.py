@@ -0,0 +1,376 @@
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+from benchmarks.dash_client import DashCallbackClient
+from benchmarks.fixtures import FIXTURES_DIR, record_fixtures
+from benchmarks.stub_server import StubApiServer
+from benchmarks.ws_stub import StubWebSocketServer
+from CoinAPI import CoinCapProvider
+from Indicators import INDICATORS
+from KrakenAPI import KrakenDataProvider
+from main import INDICATOR_OPTIONS, CombinedDashboard
+from Transport import HttpTransport
+
+# Пара й інтервали для етапів Kraken
+BENCH_PAIR = "XXBTZUSD"
+BENCH_SYMBOL = "XXBT"
+BENCH_INTERVALS = [15, 1440]
+# Скільки активів проходить через обхід історій
+BENCH_HISTORY_ASSETS = 10
+
+
+def measure(fn, repeat):
+    # Час виконання fn у мілісекундах за repeat запусків
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1000)
+    return {
+        "repeat": repeat,
+        "min_ms": round(min(times), 3),
+        "median_ms": round(statistics.median(times), 3),
+        "mean_ms": round(statistics.fmean(times), 3),
+        "max_ms": round(max(times), 3),
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class BenchmarkSuite:
+    # Етапи: fetch -> parse -> transform -> figure -> повний колбек Dash.
+    # Усі запити йдуть на локальний StubApiServer, мережа не потрібна
+    def __init__(self, server, repeat=20):
+        self.server = server
+        self.repeat = repeat
+        self.transport = HttpTransport(rate_limits={})
+        self.kraken = KrakenDataProvider(transport=self.transport)
+        self.kraken.base_url = server.kraken_url
+        self.kraken.ws_url = None
+        self.coin_cap = CoinCapProvider(transport=self.transport)
+        self.coin_cap.base_url = server.coincap_url
+        self.results = {}
+        # Пам'ять розібраної серії OHLC на свічку, байти: тип цін -> байти
+        self.bytes_per_candle = {}
+
+    def stage(self, name, fn, repeat=None):
+        self.results[name] = measure(fn, repeat or self.repeat)
+
+    def get_json(self, url, params=None):
+        return self.transport.get(url, params=params).json()
+
+    def run_fetch(self):
+        since = int(time.time()) - 365 * 10 * 86400
+        self.stage(
+            "fetch.kraken_asset_pairs",
+            lambda: self.get_json(f"{self.server.kraken_url}/AssetPairs"),
+        )
+        for interval in BENCH_INTERVALS:
+            params = {"pair": BENCH_PAIR, "interval": interval, "since": since}
+            self.stage(
+                f"fetch.kraken_ohlc_{interval}",
+                lambda: self.get_json(f"{self.server.kraken_url}/OHLC", params),
+            )
+        self.stage(
+            "fetch.coincap_assets",
+            lambda: self.get_json(f"{self.server.coincap_url}/assets", {"limit": 250}),
+        )
+        self.stage(
+            "fetch.coincap_history",
+            lambda: self.coin_cap.get_historical_data("asset-0", 90),
+        )
+
+    def run_parse(self):
+        since = int(time.time()) - 365 * 10 * 86400
+        for interval in BENCH_INTERVALS:
+            params = {"pair": BENCH_PAIR, "interval": interval, "since": since}
+            rows = self.get_json(f"{self.server.kraken_url}/OHLC", params)["result"][
+                BENCH_PAIR
+            ]
+            self.stage(
+                f"parse.kraken_ohlc_{interval}",
+                lambda: self.kraken.parse_ohlc_data(rows),
+            )
+        # rows - відповідь для останнього інтервалу
+        compact = KrakenDataProvider(transport=self.transport, price_dtype="float32")
+        self.stage(
+            f"parse.kraken_ohlc_{BENCH_INTERVALS[-1]}_float32",
+            lambda: compact.parse_ohlc_data(rows),
+        )
+        for provider in (self.kraken, compact):
+            df = provider.parse_ohlc_data(rows)
+            self.bytes_per_candle[provider.price_dtype] = int(
+                df.memory_usage(index=False).sum() / max(1, len(df))
+            )
+        assets = self.get_json(f"{self.server.coincap_url}/assets", {"limit": 250})
+        self.stage(
+            "parse.coincap_assets",
+            lambda: self.coin_cap.parse_market_data(assets["data"]),
+        )
+
+    def run_transform(self):
+        snapshot = self.coin_cap.get_market_snapshot()
+        self.stage(
+            "transform.format_market_data",
+            lambda: self.coin_cap.format_market_data(snapshot.df),
+        )
+
+        histories = [
+            self.coin_cap.get_historical_data(f"asset-{i}", 90)
+            for i in range(BENCH_HISTORY_ASSETS)
+        ]
+
+        def price_changes():
+            matrix, first_day = self.coin_cap.build_price_matrix(histories)
+            self.coin_cap.calculate_price_changes(matrix, first_day, ["7d", "30d"])
+
+        self.stage("transform.price_changes", price_changes)
+
+        df = self.kraken.get_ohlc_data(BENCH_PAIR, 15)
+        self.stage(
+            "transform.downsample_price_15",
+            lambda: self.kraken.downsample_price(df, 200),
+        )
+        self.stage(
+            "transform.aggregate_ohlc_15_to_60",
+            lambda: self.kraken.aggregate_ohlc(df, 60, 15),
+        )
+
+        indicators = list(INDICATOR_OPTIONS.values())
+        self.stage(
+            "transform.indicators_full",
+            lambda: [
+                INDICATORS[name](**params).compute(df) for name, params in indicators
+            ],
+        )
+        # Незакрита остання свічка оновлюється по черзі двома цінами
+        updated = df.copy()
+        updated.loc[updated.index[-1], "close"] *= 1.001
+        frames = [df, updated]
+
+        def update_indicators():
+            frames.reverse()
+            for name, params in indicators:
+                self.kraken.get_indicator(BENCH_PAIR, 15, frames[0], name, **params)
+
+        update_indicators()
+        self.stage("transform.indicators_last_candle", update_indicators)
+        return snapshot
+
+    def run_figures(self, snapshot):
+        self.stage(
+            "figure.market_cap",
+            lambda: self.coin_cap.create_market_cap_figure(snapshot),
+        )
+        self.stage(
+            "figure.volume_chart", lambda: self.coin_cap.create_volume_chart(snapshot)
+        )
+        self.stage(
+            "figure.market_table", lambda: self.coin_cap.create_market_table(snapshot)
+        )
+        changes_df = self.coin_cap.get_top_assets_changes(
+            limit=BENCH_HISTORY_ASSETS, snapshot=snapshot
+        )
+        self.stage(
+            "figure.stacked_bar_chart",
+            lambda: self.coin_cap.create_stacked_bar_chart(changes_df=changes_df),
+        )
+        for interval in BENCH_INTERVALS:
+            df = self.kraken.get_ohlc_data(BENCH_PAIR, interval)
+            self.stage(
+                f"figure.visualization_{interval}",
+                lambda: self.kraken.create_visualization(
+                    BENCH_PAIR, interval, 30, df=df
+                ),
+            )
+        df = self.kraken.get_ohlc_data(BENCH_PAIR, BENCH_INTERVALS[0])
+        indicators = [(label, *spec) for label, spec in INDICATOR_OPTIONS.items()]
+        self.stage(
+            f"figure.visualization_{BENCH_INTERVALS[0]}_indicators",
+            lambda: self.kraken.create_visualization(
+                BENCH_PAIR, BENCH_INTERVALS[0], 30, df=df, indicators=indicators
+            ),
+        )
+        self.stage(
+            "pipeline.changes_crawl",
+            lambda: self.coin_cap.get_top_assets_changes(
+                limit=BENCH_HISTORY_ASSETS, snapshot=snapshot
+            ),
+            repeat=max(1, self.repeat // 4),
+        )
+
+    def run_callbacks(self):
+        # Повні колбеки дашборда через /_dash-update-component
+        kraken = KrakenDataProvider(transport=self.transport)
+        kraken.base_url = self.server.kraken_url
+        kraken.ws_url = None
+        coin_cap = CoinCapProvider(transport=self.transport)
+        coin_cap.base_url = self.server.coincap_url
+        dashboard = CombinedDashboard(
+            coin_cap=coin_cap,
+            kraken=kraken,
+            pairs_cache_file=None,
+        )
+        client = DashCallbackClient(dashboard.app)
+
+        self.stage(
+            "cycle.build_market_data",
+            dashboard.build_market_data,
+            repeat=max(1, self.repeat // 4),
+        )
+
+        # Колбеки лише читають знімки фонових потоків і не чекають на них
+        dashboard.refresher.latest(1, 30)
+        dashboard.changes_refresher.latest(1, 60)
+        for name, output in [
+            ("update_market_data", "market-cap-pie.figure"),
+            ("update_changes_data", "changes-chart.figure"),
+        ]:
+
+            def update(n_intervals):
+                return client.call(
+                    output,
+                    [None, n_intervals, 0],
+                    [None],
+                    ["interval-component.n_intervals"],
+                )
+
+            self.stage(f"callback.{name}", lambda: update(1))
+
+        for period in ["1d", "15m", "all"]:
+            self.stage(
+                f"callback.update_line_chart_{period}",
+                lambda: client.call(
+                    "stream-interval.disabled",
+                    [
+                        {"symbol": BENCH_SYMBOL, "period": period},
+                        None,
+                        list(INDICATOR_OPTIONS),
+                    ],
+                    [BENCH_SYMBOL, period, None],
+                    ["line-chart-request.data"],
+                ),
+            )
+        dashboard.refresher.stop()
+        dashboard.changes_refresher.stop()
+        dashboard.pairs_refresher.stop()
+
+    def run_stream(self):
+        # Від свічки, розісланої stub WebSocket, до оновленої серії в кеші
+        interval = BENCH_INTERVALS[0]
+        with StubWebSocketServer() as ws:
+            kraken = KrakenDataProvider(transport=self.transport)
+            kraken.base_url = self.server.kraken_url
+            kraken.ws_url = ws.url
+            last = kraken.get_ohlc_data(BENCH_PAIR, interval).iloc[-1]
+            kraken.subscribe_ohlc(BENCH_PAIR, interval)
+            wsname = kraken.get_ws_name(BENCH_PAIR)
+            ws.wait_subscribed(wsname, interval)
+            begin = int(last["timestamp"].timestamp())
+            close = [float(last["close"])]
+
+            def push_candle():
+                close[0] += 1
+                ws.push(wsname, interval, begin, *[close[0]] * 5, 1.0, 1)
+                while kraken.get_cached_ohlc(BENCH_PAIR, interval)["close"].iloc[
+                    -1
+                ] != round(close[0], 5):
+                    time.sleep(0.0001)
+
+            self.stage("stream.candle_latency", push_candle)
+            kraken.stream.stop()
+
+    def run(self):
+        self.run_fetch()
+        self.run_parse()
+        snapshot = self.run_transform()
+        self.run_figures(snapshot)
+        self.run_callbacks()
+        self.run_stream()
+        return self.results
+
+
+def compare(results, baseline):
+    # Друкує зміну медіани відносно попереднього запуску
+    for name, result in sorted(results["stages"].items()):
+        before = baseline.get("stages", {}).get(name)
+        if before is None or not before["median_ms"]:
+            continue
+        ratio = result["median_ms"] / before["median_ms"]
+        print(
+            f"{name:45s} {before['median_ms']:10.3f} -> {result['median_ms']:10.3f} ms  x{ratio:.2f}"
+        )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Офлайн бенчмарки KrakenDataProvider, CoinCapProvider і колбеків дашборда"
+    )
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument(
+        "--latency", type=float, default=0.0, help="затримка stub сервера, секунди"
+    )
+    parser.add_argument("--fixtures", default=FIXTURES_DIR)
+    parser.add_argument("--compare", help="JSON попереднього запуску для порівняння")
+    parser.add_argument(
+        "--record",
+        action="store_true",
+        help="записати реальні відповіді Kraken і CoinCap у фікстури (потрібна мережа)",
+    )
+    args = parser.parse_args(argv)
+
+    if args.record:
+        record_fixtures(HttpTransport(), args.fixtures)
+        print(f"Fixtures recorded to {args.fixtures}")
+        return 0
+
+    with StubApiServer(args.fixtures, latency=args.latency) as server:
+        suite = BenchmarkSuite(server, repeat=args.repeat)
+        stages = suite.run()
+        upstream_requests = server.requests
+
+    results = {
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "latency": args.latency,
+        "repeat": args.repeat,
+        "upstream_requests": upstream_requests,
+        "ohlc_bytes_per_candle": suite.bytes_per_candle,
+        "stages": stages,
+    }
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+
+    for name, result in stages.items():
+        print(f"{name:45s} median {result['median_ms']:10.3f} ms")
+    for dtype, size in suite.bytes_per_candle.items():
+        print(f"OHLC memory per candle ({dtype} prices): {size} bytes")
+    if args.compare:
+        with open(args.compare) as f:
+            compare(results, json.load(f))
+    print(f"Results written to {os.path.abspath(args.output)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
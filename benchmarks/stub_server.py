@@ -0,0 +1,147 @@
+import json
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from benchmarks.fixtures import (
+    FIXTURES_DIR,
+    load_fixture,
+    synthetic_asset_pairs,
+    synthetic_assets,
+    synthetic_history,
+    synthetic_ohlc,
+    synthetic_trades,
+)
+
+
+class StubApiServer:
+    # Локальний HTTP сервер, що відтворює записані (або синтетичні) відповіді
+    # Kraken (/0/public/...) і CoinCap (/v2/...) із заданою затримкою
+    def __init__(
+        self, fixtures_dir=FIXTURES_DIR, latency=0.0, host="127.0.0.1", port=0
+    ):
+        self.fixtures_dir = fixtures_dir
+        self.latency = latency
+        self.requests = 0
+        # Кількість запитів за ендпоінтом; історії активів - одним ключем
+        self.endpoints = Counter()
+        self._payloads = {}
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def kraken_url(self):
+        return f"{self.base_url}/0/public"
+
+    @property
+    def coincap_url(self):
+        return f"{self.base_url}/v2"
+
+    def start(self):
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, name="stub-api", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _payload(self, name, synthesize):
+        # Відповіді кешуються, щоб час генерації не потрапляв у вимірювання
+        with self._lock:
+            payload = self._payloads.get(name)
+            if payload is None:
+                payload = load_fixture(name, self.fixtures_dir) or synthesize()
+                self._payloads[name] = payload
+            return payload
+
+    def respond(self, path, query):
+        # Повертає (статус, тіло відповіді) для шляху запиту
+        def param(key, default=None):
+            return query.get(key, [default])[0]
+
+        if path == "/0/public/AssetPairs":
+            return 200, self._payload("kraken_AssetPairs", synthetic_asset_pairs)
+
+        if path == "/0/public/OHLC":
+            pair, interval = param("pair"), int(param("interval", 1))
+            payload = self._payload(
+                f"kraken_OHLC_{pair}_{interval}",
+                lambda: synthetic_ohlc(pair, interval),
+            )
+            since = int(param("since", 0))
+            rows = [row for row in payload["result"][pair] if row[0] > since]
+            last = payload["result"]["last"]
+            return 200, {"error": [], "result": {pair: rows, "last": max(last, since)}}
+
+        if path == "/0/public/Trades":
+            pair = param("pair")
+            return 200, synthetic_trades(
+                pair, param("since", 0), int(param("count", 1000))
+            )
+
+        if path == "/v2/assets":
+            payload = self._payload("coincap_assets", synthetic_assets)
+            limit = int(param("limit", 100))
+            return 200, dict(payload, data=payload["data"][:limit])
+
+        if path.startswith("/v2/assets/") and path.endswith("/history"):
+            asset_id = path.split("/")[3]
+            payload = self._payload(
+                f"coincap_history_{asset_id}", lambda: synthetic_history(asset_id)
+            )
+            start = int(param("start", 0))
+            end = int(param("end", time.time() * 1000))
+            data = [row for row in payload["data"] if start <= row["time"] <= end]
+            return 200, dict(payload, data=data)
+
+        return 404, {"error": [f"Unknown path {path}"]}
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Без цього заголовки й тіло йдуть окремими пакетами і delayed ACK
+            # додає ~40 мс до кожної невеликої відповіді
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                status, payload = server.respond(url.path, parse_qs(url.query))
+                body = json.dumps(payload).encode()
+                endpoint = url.path
+                if endpoint.startswith("/v2/assets/"):
+                    endpoint = "/v2/assets/*/history"
+                with server._lock:
+                    server.requests += 1
+                    server.endpoints[endpoint] += 1
+                if server.latency:
+                    time.sleep(server.latency)
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
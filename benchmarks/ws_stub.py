@@ -0,0 +1,174 @@
+import json
+import socket
+import socketserver
+import threading
+
+from KrakenStream import OP_CLOSE, OP_PING, OP_PONG, OP_TEXT, accept_key
+from KrakenStream import encode_frame, read_frame
+
+
+class StubWebSocketServer:
+    # Локальна заміна WebSocket API Kraken: приймає підписки на канал ohlc
+    # і розсилає свічки, передані в push(), підписаним клієнтам
+    def __init__(self, host="127.0.0.1", port=0):
+        self.subscriptions = {}
+        self._cond = threading.Condition()
+        self._server = socketserver.ThreadingTCPServer(
+            (host, port), self._handler_class()
+        )
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"ws://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, name="stub-ws", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def wait_subscribed(self, wsname, interval, timeout=10):
+        with self._cond:
+            return self._cond.wait_for(
+                lambda: self.subscriptions.get((wsname, interval)), timeout
+            )
+
+    def push(
+        self, wsname, interval, begin, open, high, low, close, vwap, volume, count
+    ):
+        # Одна свічка у форматі каналу ohlc Kraken v1: час кінця замість початку
+        etime = begin + interval * 60
+        message = [
+            42,
+            [
+                f"{begin:.6f}",
+                f"{etime:.6f}",
+                f"{open:.5f}",
+                f"{high:.5f}",
+                f"{low:.5f}",
+                f"{close:.5f}",
+                f"{vwap:.5f}",
+                f"{volume:.8f}",
+                count,
+            ],
+            f"ohlc-{interval}",
+            wsname,
+        ]
+        frame = encode_frame(OP_TEXT, json.dumps(message).encode(), mask=False)
+        with self._cond:
+            clients = list(self.subscriptions.get((wsname, interval), ()))
+        for client in clients:
+            client.send_frame(frame)
+
+    def _subscribe(self, handler, message):
+        subscription = message.get("subscription", {})
+        interval = int(subscription.get("interval", 1))
+        with self._cond:
+            for wsname in message.get("pair", []):
+                self.subscriptions.setdefault((wsname, interval), set()).add(handler)
+                handler.send_json(
+                    {
+                        "event": "subscriptionStatus",
+                        "pair": wsname,
+                        "status": "subscribed",
+                        "subscription": subscription,
+                    }
+                )
+            self._cond.notify_all()
+
+    def _unsubscribe(self, handler, message):
+        interval = int(message.get("subscription", {}).get("interval", 1))
+        with self._cond:
+            for wsname in message.get("pair", []):
+                self.subscriptions.get((wsname, interval), set()).discard(handler)
+                handler.send_json(
+                    {
+                        "event": "subscriptionStatus",
+                        "pair": wsname,
+                        "status": "unsubscribed",
+                        "subscription": message.get("subscription", {}),
+                    }
+                )
+
+    def _unsubscribe_all(self, handler):
+        with self._cond:
+            for clients in self.subscriptions.values():
+                clients.discard(handler)
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def setup(self):
+                super().setup()
+                self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                self._send_lock = threading.Lock()
+
+            def send_frame(self, frame):
+                with self._send_lock:
+                    try:
+                        self.wfile.write(frame)
+                        self.wfile.flush()
+                    except OSError:
+                        pass
+
+            def send_json(self, payload):
+                self.send_frame(
+                    encode_frame(OP_TEXT, json.dumps(payload).encode(), mask=False)
+                )
+
+            def handle(self):
+                headers = {}
+                self.rfile.readline()
+                while True:
+                    line = self.rfile.readline().decode("latin-1").strip()
+                    if not line:
+                        break
+                    name, _, value = line.partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                key = headers.get("sec-websocket-key", "")
+                self.send_frame(
+                    (
+                        "HTTP/1.1 101 Switching Protocols\r\n"
+                        "Upgrade: websocket\r\n"
+                        "Connection: Upgrade\r\n"
+                        f"Sec-WebSocket-Accept: {accept_key(key)}\r\n\r\n"
+                    ).encode()
+                )
+                self.send_json({"event": "systemStatus", "status": "online"})
+                try:
+                    while True:
+                        fin, opcode, payload = read_frame(self.rfile)
+                        if opcode == OP_CLOSE:
+                            self.send_frame(encode_frame(OP_CLOSE, b"", mask=False))
+                            break
+                        if opcode == OP_PING:
+                            self.send_frame(encode_frame(OP_PONG, payload, mask=False))
+                            continue
+                        message = json.loads(payload)
+                        if message.get("event") == "subscribe":
+                            server._subscribe(self, message)
+                        elif message.get("event") == "unsubscribe":
+                            server._unsubscribe(self, message)
+                        elif message.get("event") == "ping":
+                            self.send_json({"event": "pong"})
+                except (ConnectionError, OSError):
+                    pass
+                finally:
+                    server._unsubscribe_all(self)
+
+        return Handler
@@ -0,0 +1,2 @@
+# Кореневий conftest: pytest додає цей каталог у sys.path, тож тести
+# імпортують модулі дашборда (SharedCache, Transport, ...) без встановлення
@@ -1,8 +1,30 @@
-from dash import Dash, html, dcc, Input, Output, dash_table
-import pandas as pd
+import os
+import numpy as np
+from dash import (
+    Dash,
+    html,
+    dcc,
+    Input,
+    Output,
+    State,
+    dash_table,
+    ctx,
+    no_update,
+    Patch,
+    ClientsideFunction,
+)
+from flask import Response
+import plotly.graph_objects as go
 from datetime import datetime
 from KrakenAPI import KrakenDataProvider
 from CoinAPI import CoinCapProvider
+from OHLCStore import DATA_DIR, OHLC_STORE_DIR, OHLCStore
+from FigureCache import FigureCache, frame_version
+from Metrics import CALLBACK_ERRORS, CALLBACK_SECONDS, REGISTRY, enable_trace, timed
+from Refresher import BackgroundRefresher
+from SharedCache import SharedCache
+from SingleFlight import stale_since
+from Transport import HttpTransport
 
 # Константи з LineChartHistoryDate
 PERIOD_VALUES = {
@@ -15,15 +37,216 @@ PERIOD_VALUES = {
     "all": (21600, None),
 }
 
+# Індикатори, які можна накласти на графік ціни: підпис -> (назва, параметри)
+INDICATOR_OPTIONS = {
+    "SMA 20": ("sma", {"period": 20}),
+    "EMA 50": ("ema", {"period": 50}),
+    "Bollinger 20/2": ("bollinger", {"period": 20, "k": 2}),
+    "VWAP bands 20/2": ("vwap_bands", {"period": 20, "k": 2}),
+    "RSI 14": ("rsi", {"period": 14}),
+}
+
+# Скільки фігур графіка ціни зберігає браузер і скільки секунд фігура
+# показується без звернення до сервера (потік WebSocket оновлює її і далі)
+LINE_CHART_CACHE_SIZE = 8
+LINE_CHART_CACHE_MAX_AGE = 60
+
+# Період фонового оновлення даних ринку, секунди
+REFRESH_INTERVAL = 60
+# Скільки потік змін цін чекає на перший знімок ринку, секунди
+REFRESH_WAIT_TIMEOUT = 30
+# Після відкриття сторінки і після Refresh клієнт кілька разів частіше за
+# interval-component перевіряє, чи готовий новий знімок: колбеки не чекають
+# на фоновий потік. Період, секунди, і кількість перевірок
+SNAPSHOT_POLL_INTERVAL = 2
+SNAPSHOT_POLL_COUNT = 15
+# Бюджет відповіді колбека, секунди: якщо upstream не встиг, показуються
+# останні вдалі дані з позначкою, а оновлення завершується у фоні
+CALLBACK_BUDGET = 5
+# Скільки активів показує таблиця ринку (None - весь список) і рядків на сторінці
+MARKET_TABLE_SIZE = None
+MARKET_TABLE_PAGE_SIZE = 10
+# Локальний кеш списку пар для теплого старту (сховище OHLC - OHLC_STORE_DIR)
+PAIRS_CACHE_FILE = os.path.join(DATA_DIR, "pairs.json")
+# Період оновлення списку пар Kraken, секунди
+PAIRS_REFRESH_INTERVAL = 60 * 60
+# Перша пауза між повторами, поки список пар ще жодного разу не завантажився,
+# секунди; далі подвоюється до PAIRS_REFRESH_INTERVAL
+PAIRS_RETRY_DELAY = 5
+# Файл SQLite спільного кешу для кількох воркерів (gunicorn -w N): дані з
+# upstream завантажує лише один воркер. Без змінної кожен процес ходить сам
+SHARED_CACHE_FILE = os.environ.get("DASHBOARD_SHARED_CACHE")
+# Як часто клієнт забирає нові свічки з потоку WebSocket, секунди
+STREAM_INTERVAL = 1
+# Файл журналу трасування запитів ("-" - stderr); без змінної журнал вимкнено
+TRACE_LOG = os.environ.get("DASHBOARD_TRACE_LOG")
+
+
+def parse_request_range(x_range):
+    # Видимий діапазон осі X із запиту line-chart-request; межі None після
+    # скидання масштабу означають початок і кінець усієї історії
+    import pandas as pd
+
+    start, end = x_range
+    return (
+        None if start is None else pd.Timestamp(start),
+        None if end is None else pd.Timestamp(end),
+    )
+
+
+def stream_state(pair, interval, days, df, figure):
+    # Стан потокового оновлення графіка: остання свічка, яку вже показує клієнт,
+    # і кількість точок у трасах. None, якщо хвіст графіка проріджено
+    # і точки не можна оновлювати по одній
+    import pandas as pd
+
+    if df is None or df.empty:
+        return None
+    price, volume = figure["data"][0], figure["data"][1]
+    last = df.iloc[-1]
+    if not price["x"] or not volume["x"]:
+        return None
+    if pd.Timestamp(price["x"][-1]) != last["timestamp"] or (
+        pd.Timestamp(volume["x"][-1]) != last["timestamp"]
+    ):
+        return None
+    # Траси індикаторів мають ті самі точки, що й ціна: [номер траси, meta]
+    overlays = [
+        [number, trace["meta"]]
+        for number, trace in enumerate(figure["data"])
+        if number > 1 and trace.get("meta")
+    ]
+    return {
+        "pair": pair,
+        "interval": interval,
+        "days": days,
+        "since": last["timestamp"].isoformat(),
+        "close": float(last["close"]),
+        "volume": float(last["volume"]),
+        "points": [len(price["x"]), len(volume["x"])],
+        "overlays": overlays,
+        # Осі X рядків графіка: ціна, обсяг і, якщо є, осцилятори (RSI)
+        "axes": [
+            axis for axis in ("xaxis", "xaxis2", "xaxis3") if axis in figure["layout"]
+        ],
+    }
+
+
+def stream_patch(df, state, overlays=()):
+    # Часткове оновлення фігури для свічок, новіших за показану клієнтові:
+    # остання точка замінюється, нові дописуються. (None, state), якщо змін немає.
+    # overlays - (номер траси, масив значень індикатора довжини len(df))
+    import pandas as pd
+
+    if df is None:
+        return None, state
+    since = pd.Timestamp(state["since"])
+    mask = (df["timestamp"] >= since).to_numpy()
+    tail = df[mask]
+    if tail.empty or tail["timestamp"].iloc[0] != since:
+        return None, state
+    first, rows = tail.iloc[0], tail.iloc[1:]
+    if rows.empty and (
+        float(first["close"]) == state["close"]
+        and float(first["volume"]) == state["volume"]
+    ):
+        return None, state
+
+    price_points, volume_points = state["points"]
+    patched = Patch()
+    patched["data"][0]["y"][price_points - 1] = float(first["close"])
+    patched["data"][1]["y"][volume_points - 1] = float(first["volume"])
+    if not rows.empty:
+        x = [ts.isoformat() for ts in rows["timestamp"]]
+        patched["data"][0]["x"].extend(x)
+        patched["data"][0]["y"].extend(rows["close"].tolist())
+        patched["data"][1]["x"].extend(x)
+        patched["data"][1]["y"].extend(rows["volume"].tolist())
+        # Вікно зсувається разом з новими свічками
+        end = rows["timestamp"].iloc[-1] + pd.Timedelta(minutes=state["interval"])
+        x_range = [
+            (end - pd.Timedelta(days=state["days"])).isoformat(),
+            end.isoformat(),
+        ]
+        for axis in state.get("axes", ["xaxis", "xaxis2"]):
+            patched["layout"][axis]["range"] = x_range
+
+    positions = np.flatnonzero(mask)
+    for number, values in overlays:
+        # NaN (індикатор ще не набрав вікна) передається як порожня точка
+        points = [None if np.isnan(v) else float(v) for v in values[positions]]
+        patched["data"][number]["y"][price_points - 1] = points[0]
+        if len(points) > 1:
+            patched["data"][number]["x"].extend(x)
+            patched["data"][number]["y"].extend(points[1:])
+
+    last = tail.iloc[-1]
+    state = dict(
+        state,
+        since=last["timestamp"].isoformat(),
+        close=float(last["close"]),
+        volume=float(last["volume"]),
+        points=[price_points + len(rows), volume_points + len(rows)],
+    )
+    return patched, state
+
+
+def changed_outputs(outputs, keys, client_keys):
+    # Виходи, які клієнт уже має, не надсилаються повторно; останній вихід -
+    # нові ключі для сховища клієнта
+    client_keys = client_keys or [None] * len(keys)
+    return tuple(
+        no_update if key == client_key else output
+        for output, key, client_key in zip(outputs, keys, client_keys)
+    ) + (list(keys),)
+
 
 class CombinedDashboard:
-    def __init__(self):
+    def __init__(
+        self,
+        coin_cap=None,
+        kraken=None,
+        pairs_cache_file=PAIRS_CACHE_FILE,
+        shared_cache_file=SHARED_CACHE_FILE,
+    ):
+        # Провайдери можна підмінити (бенчмарки, навантажувальні тести)
         self.app = Dash(__name__)
-        self.coin_cap = CoinCapProvider()
-        self.kraken = KrakenDataProvider()
-        self.symbol_ticker = self.kraken.get_trading_pairs()
+        # Один пул з'єднань і спільні ліміти запитів для обох провайдерів
+        self.transport = HttpTransport()
+        self.shared_cache = (
+            SharedCache(shared_cache_file) if shared_cache_file else None
+        )
+        self.coin_cap = coin_cap or CoinCapProvider(
+            transport=self.transport, shared_cache=self.shared_cache
+        )
+        self.kraken = kraken or KrakenDataProvider(
+            store=OHLCStore(OHLC_STORE_DIR),
+            transport=self.transport,
+            shared_cache=self.shared_cache,
+        )
+        self.pairs_cache_file = pairs_cache_file
+        # Пари з локального кешу без мережевого запиту; свіжий список
+        # завантажується у фоні й оновлює опції випадаючого списку
+        self.symbol_ticker = self.kraken.load_trading_pairs_cache(pairs_cache_file)
+        self.pairs_refresher = BackgroundRefresher(
+            self.refresh_trading_pairs,
+            interval=PAIRS_REFRESH_INTERVAL,
+            name="pairs-refresher",
+            retry=PAIRS_RETRY_DELAY,
+        )
+        self.figure_cache = FigureCache()
+        self.refresher = BackgroundRefresher(
+            self.build_market_data, interval=REFRESH_INTERVAL, name="market-refresher"
+        )
+        # Зміни цін оновлюються окремо, щоб швидкі секції не чекали на історії
+        self.changes_refresher = BackgroundRefresher(
+            self.build_changes_data,
+            interval=REFRESH_INTERVAL,
+            name="changes-refresher",
+        )
         self.setup_layout()
         self.setup_callbacks()
+        self.setup_routes()
 
     def setup_layout(self):
         self.app.layout = html.Div(
@@ -76,14 +299,43 @@ class CombinedDashboard:
                             ],
                             style={"display": "flex", "flexDirection": "row"},
                         ),
+                        dcc.Checklist(
+                            id="indicators",
+                            options=list(INDICATOR_OPTIONS.keys()),
+                            value=[],
+                            inline=True,
+                            style={"padding": 10},
+                        ),
                         dcc.Graph(id="line-chart"),
+                        # Фігури, які вже бачив браузер: перемикання періоду
+                        # без запиту до сервера (assets/line_chart.js)
+                        dcc.Store(
+                            id="line-chart-cache",
+                            data={
+                                "max_age": LINE_CHART_CACHE_MAX_AGE * 1000,
+                                "size": LINE_CHART_CACHE_SIZE,
+                                "entries": {},
+                            },
+                        ),
+                        dcc.Store(id="line-chart-request"),
+                        # Ключ фігури, яку вже показує клієнт
+                        dcc.Store(id="line-chart-key"),
+                        # Потокові оновлення графіка з WebSocket Kraken
+                        dcc.Store(id="line-chart-stream"),
+                        dcc.Interval(
+                            id="stream-interval",
+                            interval=STREAM_INTERVAL * 1000,
+                            disabled=True,
+                        ),
                     ],
                     style={"marginBottom": "40px"},
                 ),
                 # Volume Chart Top-10
                 html.Div(
                     [
-                        html.H2("Volume Chart Top-10 Crypto", style={"textAlign": "left"}),
+                        html.H2(
+                            "Volume Chart Top-10 Crypto", style={"textAlign": "left"}
+                        ),
                         dcc.Graph(id="volume-chart"),
                     ],
                 ),
@@ -148,11 +400,12 @@ class CombinedDashboard:
                         html.Div(
                             [
                                 html.H3(
-                                    "Top 10 Cryptocurrencies",
+                                    "Top Cryptocurrencies",
                                     style={"textAlign": "left"},
                                 ),
                                 dash_table.DataTable(
                                     id="crypto-table",
+                                    page_size=MARKET_TABLE_PAGE_SIZE,
                                     columns=[
                                         {"name": "Rank", "id": "Rank"},
                                         {"name": "Symbol", "id": "Symbol"},
@@ -203,83 +456,346 @@ class CombinedDashboard:
                         ),
                     ]
                 ),
+                # Ключі даних ринку та змін цін, які вже показує клієнт
+                dcc.Store(id="market-data-keys"),
+                dcc.Store(id="changes-data-keys"),
                 # Interval component for auto-refresh
                 dcc.Interval(
                     id="interval-component",
-                    interval=60 * 1000,  # refresh every minute
+                    interval=REFRESH_INTERVAL * 1000,  # refresh every minute
+                    n_intervals=0,
+                ),
+                dcc.Interval(
+                    id="snapshot-poll",
+                    interval=SNAPSHOT_POLL_INTERVAL * 1000,
                     n_intervals=0,
+                    max_intervals=SNAPSHOT_POLL_COUNT,
                 ),
             ]
         )
 
     def setup_callbacks(self):
-        @self.app.callback(
+        # Перемикання символу й періоду та zoom/pan обробляються в браузері
+        # (assets/line_chart.js): фігура береться з кешу line-chart-cache, а
+        # сервер отримує запит line-chart-request лише для відсутньої або
+        # застарілої фігури чи вікна поза вже переданими детальними даними
+        self.app.clientside_callback(
+            ClientsideFunction("line_chart", "select"),
             Output("line-chart", "figure"),
-            [
-                Input("symbol", "value"),
-                Input("period", "value"),
-                Input("refresh-button", "n_clicks"),
-            ],
+            Output("line-chart-key", "data"),
+            Output("line-chart-stream", "data"),
+            Output("stream-interval", "disabled"),
+            Output("line-chart-request", "data"),
+            Input("symbol", "value"),
+            Input("period", "value"),
+            Input("line-chart", "relayoutData"),
+            State("indicators", "value"),
+            State("line-chart-cache", "data"),
+            State("line-chart", "figure"),
+        )
+        self.app.clientside_callback(
+            ClientsideFunction("line_chart", "store"),
+            Output("line-chart-cache", "data"),
+            Input("line-chart", "figure"),
+            State("line-chart-key", "data"),
+            State("line-chart-stream", "data"),
+            State("line-chart-cache", "data"),
+            prevent_initial_call=True,
         )
-        def update_line_chart(symbol, period, n_clicks):
+
+        @self.app.callback(
+            Output("line-chart", "figure", allow_duplicate=True),
+            Output("line-chart-key", "data", allow_duplicate=True),
+            Output("line-chart-stream", "data", allow_duplicate=True),
+            Output("stream-interval", "disabled", allow_duplicate=True),
+            Input("line-chart-request", "data"),
+            Input("refresh-button", "n_clicks"),
+            Input("indicators", "value"),
+            State("symbol", "value"),
+            State("period", "value"),
+            State("line-chart-key", "data"),
+            prevent_initial_call=True,
+        )
+        @timed(CALLBACK_SECONDS, CALLBACK_ERRORS, callback="update_line_chart")
+        def update_line_chart(request, n_clicks, selected, symbol, period, client_key):
+            # Після zoom/pan перепроріджуємо лише видиме вікно
+            x_range = None
+            if ctx.triggered_id == "line-chart-request" and request.get("range"):
+                x_range = parse_request_range(request["range"])
 
             interval, days = PERIOD_VALUES.get(period)
             ticker = self.symbol_ticker.get(symbol)
-            # Якщо обрано період «all», обчислюємо кількість днів з першої торгівлі
+            if ticker is None:
+                # Холодний старт без кешу пар: список завантажується у фоні,
+                # колбек на нього не чекає
+                self.pairs_refresher.start()
+                figure = go.Figure(layout={"title_text": "Loading trading pairs..."})
+                return figure, None, None, True
+            # Серія агрегується з дрібнішої в кеші, якщо та покриває період
+            df = self.kraken.get_candles(ticker, interval, days, budget=CALLBACK_BUDGET)
+            stale = stale_since(df)
+            # Якщо обрано період «all», обчислюємо кількість днів з першої торгівлі.
+            # Серія «all» має максимальний інтервал, тож вона ж дає першу дату
             if period == "all":
-                first_date = self.kraken.get_first_trade_date(ticker)
+                first_date = self.kraken.get_first_trade_date(ticker, df)
                 if first_date:
-                    days = (pd.Timestamp.now() - first_date).days
+                    days = (datetime.now() - first_date).days
                 else:
                     days = (
                         365 * 8
                     )  # Fallback на 8 років якщо не вдалося отримати першу дату
-            return self.kraken.create_visualization(ticker, interval, days)
+
+            indicators = [
+                (label, *INDICATOR_OPTIONS[label])
+                for label in INDICATOR_OPTIONS
+                if label in (selected or [])
+            ]
+
+            labels = sorted(i[0] for i in indicators)
+
+            # Серія лише дописується, тож її версію визначають кілька останніх свічок
+            def build_figure():
+                fig = self.kraken.create_visualization(
+                    ticker,
+                    interval,
+                    days,
+                    x_range=x_range,
+                    df=df,
+                    indicators=indicators,
+                )
+                if stale is not None:
+                    updated = datetime.fromtimestamp(stale).strftime(
+                        "%Y-%m-%d %H:%M:%S"
+                    )
+                    fig.update_layout(
+                        title_text=f"{fig.layout.title.text} (stale data from {updated})"
+                    )
+                # Ключ у кеші браузера лише для стандартного вікна періоду
+                if x_range is None:
+                    chart = "|".join([symbol, period, ",".join(labels)])
+                    fig.update_layout(meta=dict(fig.layout.meta, chart=chart))
+                return fig
+
+            key, figure = self.figure_cache.get(
+                "create_visualization",
+                [symbol, period, ticker, days, x_range, stale, labels],
+                frame_version(df, tail=2),
+                build_figure,
+            )
+
+            # Свіжі свічки з WebSocket лише для стандартного вікна, яке закінчується
+            # зараз; після zoom/pan користувач дивиться історію і потік вимикається
+            state = None
+            if x_range is None and self.kraken.subscribe_ohlc(ticker, interval):
+                state = stream_state(ticker, interval, days, df, figure)
+            if key == client_key:
+                return no_update, no_update, state, state is None
+            return figure, key, state, state is None
+
+        @self.app.callback(
+            Output("line-chart", "figure", allow_duplicate=True),
+            Output("line-chart-key", "data", allow_duplicate=True),
+            Output("line-chart-stream", "data", allow_duplicate=True),
+            Input("stream-interval", "n_intervals"),
+            State("line-chart-stream", "data"),
+            prevent_initial_call=True,
+        )
+        @timed(CALLBACK_SECONDS, CALLBACK_ERRORS, callback="stream_line_chart")
+        def stream_line_chart(n_intervals, state):
+            # Надсилає лише змінені й нові свічки замість усієї фігури
+            if not state:
+                return no_update, no_update, no_update
+            df = self.kraken.get_cached_ohlc(state["pair"], state["interval"])
+            overlays = []
+            if df is not None:
+                for number, meta in state.get("overlays", []):
+                    values = self.kraken.get_indicator(
+                        state["pair"],
+                        state["interval"],
+                        df,
+                        meta["indicator"],
+                        **meta["params"],
+                    )
+                    overlays.append((number, values[meta["output"]]))
+            patched, state = stream_patch(df, state, overlays)
+            if patched is None:
+                return no_update, no_update, no_update
+            # Фігура клієнта вже не відповідає ключу з кешу фігур
+            return patched, None, state
+
+        # Refresh знову запускає часті перевірки знімків (max_intervals
+        # рахує від n_intervals)
+        @self.app.callback(
+            Output("snapshot-poll", "n_intervals"),
+            Input("refresh-button", "n_clicks"),
+            prevent_initial_call=True,
+        )
+        @timed(CALLBACK_SECONDS, CALLBACK_ERRORS, callback="restart_snapshot_poll")
+        def restart_snapshot_poll(n_clicks):
+            return 0
+
+        @self.app.callback(
+            Output("symbol", "options"),
+            Input("interval-component", "n_intervals"),
+            State("symbol", "options"),
+        )
+        @timed(CALLBACK_SECONDS, CALLBACK_ERRORS, callback="update_symbol_options")
+        def update_symbol_options(n_intervals, options):
+            # Список пар оновлює pairs_refresher; без кешу на диску опції
+            # з'являться з наступним тиком після першого вдалого завантаження
+            self.pairs_refresher.start()
+            new_options = list(self.symbol_ticker.keys())
+            if new_options == options:
+                return no_update
+            return new_options
 
         @self.app.callback(
             [
                 Output("market-cap-pie", "figure"),
                 Output("crypto-table", "data"),
                 Output("volume-chart", "figure"),
+                Output("last-update-time", "children"),
+                Output("market-data-keys", "data"),
+            ],
+            [
+                Input("refresh-button", "n_clicks"),
+                Input("interval-component", "n_intervals"),
+                Input("snapshot-poll", "n_intervals"),
+            ],
+            State("market-data-keys", "data"),
+        )
+        @timed(CALLBACK_SECONDS, CALLBACK_ERRORS, callback="update_market_data")
+        def update_market_data(n_clicks, n_intervals, n_polls, client_keys):
+            # Швидкі секції: один запит /assets, не чекають на історії активів
+            snapshot = self.read_snapshot(self.refresher)
+            if snapshot is None:
+                return (no_update,) * 5
+            outputs, keys, _ = snapshot.data
+            return changed_outputs(outputs, keys, client_keys)
+
+        # Повільні секції: обхід історій активів іде в потоці changes_refresher
+        # цього процесу, колбек лише читає останній готовий знімок (read_snapshot).
+        # Фоновий колбек Dash (DiskcacheManager) запускав би окремий процес
+        # на кожен виклик, без потоку оновлення і знімка
+        @self.app.callback(
+            [
                 Output("changes-chart", "figure"),
                 Output("changes-table", "data"),
-                Output("last-update-time", "children"),
+                Output("changes-data-keys", "data"),
             ],
             [
                 Input("refresh-button", "n_clicks"),
                 Input("interval-component", "n_intervals"),
+                Input("snapshot-poll", "n_intervals"),
             ],
+            State("changes-data-keys", "data"),
         )
-        def update_all_data(n_clicks, n_intervals):
-            # Get market cap and table data
-            market_cap_figure = self.coin_cap.create_market_cap_figure()
-            table_data = self.coin_cap.create_market_table()
-            volume_chart = self.coin_cap.create_volume_chart()
-
-            # Get changes data
-            changes_figure = self.coin_cap.create_stacked_bar_chart()
-            changes_df = self.coin_cap.get_top_assets_changes()
-            changes_table_data = (
-                changes_df.round(2).to_dict("records") if changes_df is not None else []
-            )
+        @timed(CALLBACK_SECONDS, CALLBACK_ERRORS, callback="update_changes_data")
+        def update_changes_data(n_clicks, n_intervals, n_polls, client_keys):
+            snapshot = self.read_snapshot(self.changes_refresher)
+            if snapshot is None:
+                return (no_update,) * 3
+            outputs, keys = snapshot.data
+            return changed_outputs(outputs, keys, client_keys)
 
-            update_time = (
-                f"Last updated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
-            )
+    def read_snapshot(self, refresher):
+        # Колбеки лише читають знімок, який публікує фоновий потік, і ніколи
+        # на нього не чекають: до першого знімка повертається None, а Refresh
+        # лише будить потік. Новий знімок забере наступний тик snapshot-poll
+        if ctx.triggered_id == "refresh-button":
+            refresher.refresh_now()
+        else:
+            refresher.start()
+        return refresher.snapshot
+
+    def setup_routes(self):
+        # Метрики у форматі Prometheus: запити до API, парсинг, фігури, колбеки
+        @self.app.server.route("/metrics")
+        def metrics():
+            return Response(REGISTRY.render(), mimetype="text/plain; version=0.0.4")
+
+    def refresh_trading_pairs(self):
+        # Фонове оновлення списку пар Kraken із збереженням у локальний кеш
+        pairs = self.kraken.get_trading_pairs()
+        if not pairs:
+            raise Exception("Error getting trading pairs")
+        self.symbol_ticker = pairs
+        if self.pairs_cache_file:
+            self.kraken.save_trading_pairs_cache(self.pairs_cache_file, pairs)
+        return pairs
 
-            return (
-                market_cap_figure,
-                table_data,
-                volume_chart,
-                changes_figure,
-                changes_table_data,
-                update_time,
+    def build_market_data(self):
+        # Один цикл фонового оновлення даних ринку CoinCap: виходи колбека,
+        # їхні ключі та сам знімок, з якого будуються зміни цін
+        snapshot = self.coin_cap.get_market_snapshot()
+        if snapshot is None:
+            # Фоновий потік залишить попередній знімок
+            raise Exception("Error getting market data")
+
+        # Get market cap and table data
+        # Ключі за хешем вмісту знімка, а не за лічильником версій: наступний
+        # запит клієнта може обробити інший воркер (gunicorn -w N)
+        market_cap_key, market_cap_figure = self.figure_cache.get(
+            "create_market_cap_figure",
+            [],
+            snapshot.digest,
+            lambda: self.coin_cap.create_market_cap_figure(snapshot),
+        )
+        table_data = self.coin_cap.create_market_table(
+            snapshot, top_n=MARKET_TABLE_SIZE
+        )
+        table_key = f"crypto-table:{snapshot.digest}"
+        volume_key, volume_chart = self.figure_cache.get(
+            "create_volume_chart",
+            [],
+            snapshot.digest,
+            lambda: self.coin_cap.create_volume_chart(snapshot),
+        )
+
+        update_time = f"Last updated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
+        if snapshot.stale_since is not None:
+            updated = datetime.fromtimestamp(snapshot.stale_since)
+            update_time += (
+                f" (CoinCap unavailable, market data from {updated:%Y-%m-%d %H:%M:%S})"
             )
 
+        outputs = (market_cap_figure, table_data, volume_chart, update_time)
+        keys = (market_cap_key, table_key, volume_key, update_time)
+        return outputs, keys, snapshot
+
+    def build_changes_data(self):
+        # Один цикл фонового оновлення змін цін: історії активів з поточного
+        # знімка ринку, який публікує self.refresher
+        market = self.refresher.latest(1, REFRESH_WAIT_TIMEOUT)
+        if market is None:
+            raise Exception("Error getting market data")
+        snapshot = market.data[2]
+
+        # Get changes data
+        changes_df = self.coin_cap.get_top_assets_changes(snapshot=snapshot)
+        changes_version = frame_version(changes_df)
+        changes_key, changes_figure = self.figure_cache.get(
+            "create_stacked_bar_chart",
+            [],
+            changes_version,
+            lambda: (
+                self.coin_cap.create_stacked_bar_chart(changes_df=changes_df)
+                if changes_df is not None
+                else go.Figure()
+            ),
+        )
+        changes_table_data = (
+            changes_df.round(2).to_dict("records") if changes_df is not None else []
+        )
+        changes_table_key = f"changes-table:{changes_version}"
+        return (changes_figure, changes_table_data), (changes_key, changes_table_key)
+
     def run_server(self, debug=True, host="0.0.0.0", port=8050):
         self.app.run_server(debug=debug, host=host, port=port)
 
 
 if __name__ == "__main__":
+    if TRACE_LOG:
+        enable_trace(None if TRACE_LOG == "-" else TRACE_LOG)
     dashboard = CombinedDashboard()
     dashboard.run_server()
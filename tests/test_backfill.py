@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from Backfill import HistoryBackfill
+from KrakenAPI import KrakenDataProvider
+from OHLCStore import OHLCStore
+
+PAIR = "XXBTZUSD"
+START = 1_700_006_400  # кратне добі, як межі свічок Kraken
+STOP = START + 2 * 86_400  # перша свічка вікна /OHLC
+
+
+def candles(kraken, start, count, interval):
+    rows = [
+        [start + i * interval * 60, "1", "2", "0.5", "1.5", "1.25", "1", 1]
+        for i in range(count)
+    ]
+    return kraken.parse_ohlc_data(rows)
+
+
+def test_finalize_resumes_after_interrupted_prepend(tmp_path, monkeypatch):
+    kraken = KrakenDataProvider()
+    store = OHLCStore(str(tmp_path / "ohlc"))
+    staging = OHLCStore(str(tmp_path / "staging"))
+    backfill = HistoryBackfill(kraken, store, staging, intervals=[15, 60, 240])
+    for interval in backfill.intervals:
+        store.append(PAIR, interval, candles(kraken, STOP, 20, interval), 0)
+    staging.append(PAIR, 15, candles(kraken, START, 192, 15), STOP * 10**9)
+
+    # Збій посеред prepend інтервалу 60: новий файл даних записано,
+    # але метадані на нього ще не перемкнуто
+    write_meta = store._write_meta
+
+    def crash(meta_path, meta):
+        if meta_path.endswith("_60.json"):
+            raise OSError("crash")
+        write_meta(meta_path, meta)
+
+    monkeypatch.setattr(store, "_write_meta", crash)
+    with pytest.raises(OSError):
+        backfill.finalize(PAIR, STOP)
+    monkeypatch.undo()
+
+    # Перервана серія лишилася попередньою, а не порожньою
+    df, _ = store.load(PAIR, 60)
+    assert len(df) == 20
+    assert df["timestamp"].iloc[0] == pd.Timestamp(STOP, unit="s")
+
+    assert backfill.backfill_pair(PAIR) == 192
+    for interval in backfill.intervals:
+        df, _ = store.load(PAIR, interval)
+        steps = np.diff(df["timestamp"].to_numpy()) / np.timedelta64(1, "m")
+        assert (steps == interval).all()
+        assert df["timestamp"].iloc[0] == pd.Timestamp(START, unit="s")
+        assert len(df) == (STOP - START) // (interval * 60) + 20
+    assert staging.load(PAIR, 15) is None
+    # Після перемикання на новий файл старі файли даних прибрано
+    assert sorted(p.name for p in (tmp_path / "ohlc").glob("*.bin")) == [
+        f"{PAIR}_{interval}.1.bin" for interval in (15, 240, 60)
+    ]
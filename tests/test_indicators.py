@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+
+from Indicators import INDICATORS, IndicatorSeries
+from KrakenAPI import KrakenDataProvider
+
+START = 1_700_006_400
+
+
+def candles(count):
+    # Детермінований «випадковий» ряд, щоб RSI мав і зростання, і падіння
+    rng = np.random.default_rng(0)
+    close = 100 + np.cumsum(rng.normal(0, 1, count))
+    rows = [
+        [
+            START + i * 900,
+            f"{close[i] - 0.2}",
+            f"{close[i] + 1}",
+            f"{close[i] - 1}",
+            f"{close[i]}",
+            f"{close[i] + 0.1}",
+            f"{1 + i % 4}",
+            1 + i % 3,
+        ]
+        for i in range(count)
+    ]
+    return KrakenDataProvider().parse_ohlc_data(rows)
+
+
+@pytest.mark.parametrize(
+    "name, params",
+    [
+        ("sma", {"period": 20}),
+        ("ema", {"period": 50}),
+        ("rsi", {"period": 14}),
+        ("bollinger", {"period": 20, "k": 2}),
+        ("vwap_bands", {"period": 20, "k": 2}),
+    ],
+)
+def test_sync_matches_recompute(name, params):
+    df = candles(300)
+    series = IndicatorSeries(INDICATORS[name](**params))
+    series.sync(df.iloc[:200])
+
+    # Незакрита свічка кілька разів змінюється, потім дописуються нові
+    for end in range(200, 300):
+        tick = df.iloc[: end + 1].copy()
+        tick.loc[end, "close"] += 0.5
+        series.sync(tick)
+        series.sync(df.iloc[: end + 1])
+
+    expected = IndicatorSeries(INDICATORS[name](**params))
+    expected.recompute(df)
+    for output, values in expected.view().items():
+        np.testing.assert_allclose(series.view()[output], values, equal_nan=True)
@@ -0,0 +1,212 @@
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from KrakenAPI import KrakenDataProvider
+from OHLCStore import OHLCStore
+
+PAIR = "XXBTZUSD"
+START = 1_700_006_400  # кратне добі, як межі свічок Kraken
+
+
+def candle_rows(start, count, interval, close=100.0):
+    # Рядки у форматі /OHLC: [time, open, high, low, close, vwap, volume, count]
+    return [
+        [
+            start + i * interval * 60,
+            f"{close + i}",
+            f"{close + i + 1}",
+            f"{close + i - 1}",
+            f"{close + i + 0.5}",
+            f"{close + i + 0.25}",
+            f"{1 + i % 3}",
+            1 + i % 5,
+        ]
+        for i in range(count)
+    ]
+
+
+class FakeResponse:
+    status_code = 200
+
+    def __init__(self, payload):
+        self.payload = payload
+
+    def json(self):
+        return self.payload
+
+
+class KrakenRulesTransport:
+    # /OHLC за правилами Kraken: лише 720 останніх свічок до now після since
+    def __init__(self, interval, now):
+        self.interval = interval
+        self.now = now
+
+    def get(self, url, params=None):
+        step = self.interval * 60
+        first = max(START, self.now - 719 * step)
+        rows = candle_rows(first, (self.now - first) // step + 1, self.interval)
+        rows = [row for row in rows if row[0] > int(params["since"])]
+        last = rows[-2][0] if len(rows) > 1 else int(params["since"])
+        return FakeResponse({"error": [], "result": {PAIR: rows, "last": last}})
+
+
+def test_merge_replaces_open_candle():
+    kraken = KrakenDataProvider()
+    cached = kraken.parse_ohlc_data(candle_rows(START, 10, 15))
+    # Нове вікно починається з незакритої останньої свічки кешу
+    new = kraken.parse_ohlc_data(candle_rows(START + 9 * 900, 3, 15, close=500))
+
+    merged = kraken.merge_ohlc(cached, new, 15)
+
+    assert len(merged) == 12
+    assert merged["timestamp"].is_monotonic_increasing
+    assert merged["timestamp"].is_unique
+    assert merged["close"].iloc[9] == 500.5
+    assert merged["close"].iloc[8] == cached["close"].iloc[8]
+
+
+def test_merge_drops_cached_series_across_gap():
+    kraken = KrakenDataProvider()
+    cached = kraken.parse_ohlc_data(candle_rows(START, 10, 15))
+    new = kraken.parse_ohlc_data(candle_rows(START + 100 * 900, 5, 15))
+
+    merged = kraken.merge_ohlc(cached, new, 15)
+
+    assert merged["timestamp"].tolist() == new["timestamp"].tolist()
+
+
+def test_refresh_after_long_idle_has_no_holes():
+    transport = KrakenRulesTransport(15, START + 1000 * 900)
+    kraken = KrakenDataProvider(transport=transport)
+    cached = kraken.refresh_ohlc(PAIR, 15, None)
+
+    # 30 днів без оновлень - більше за 720 свічок по 15 хвилин
+    transport.now += 30 * 86_400
+    df, _ = kraken.refresh_ohlc(PAIR, 15, cached)
+
+    steps = np.diff(df["timestamp"].to_numpy()) / np.timedelta64(1, "m")
+    assert (steps == 15).all()
+    assert df["timestamp"].iloc[-1] == pd.Timestamp(transport.now, unit="s")
+
+
+def test_store_rewrites_series_after_long_idle(tmp_path):
+    store = OHLCStore(str(tmp_path))
+    transport = KrakenRulesTransport(15, START + 1000 * 900)
+    kraken = KrakenDataProvider(transport=transport, store=store)
+    cached = kraken.refresh_ohlc(PAIR, 15, None)
+
+    transport.now += 30 * 86_400
+    kraken.refresh_ohlc(PAIR, 15, cached)
+
+    # Після перезапуску серія з диска теж без пропуску
+    df, _ = store.load(PAIR, 15)
+    steps = np.diff(df["timestamp"].to_numpy()) / np.timedelta64(1, "m")
+    assert (steps == 15).all()
+    assert len(df) == 720
+
+
+def test_store_keeps_gaps_when_allowed(tmp_path):
+    store = OHLCStore(str(tmp_path))
+    kraken = KrakenDataProvider()
+    store.append(PAIR, 15, kraken.parse_ohlc_data(candle_rows(START, 10, 15)), 0)
+    later = kraken.parse_ohlc_data(candle_rows(START + 100 * 900, 5, 15))
+
+    store.append(PAIR, 15, later, 0, gaps=True)
+
+    df, _ = store.load(PAIR, 15)
+    assert len(df) == 15
+    assert df["timestamp"].is_monotonic_increasing
+
+
+def test_stream_update_leaves_taken_frame_intact():
+    kraken = KrakenDataProvider()
+    kraken._ws_pairs["XBT/USD"] = PAIR
+    df = kraken.parse_ohlc_data(candle_rows(START, 10, 15))
+    kraken._ohlc_cache[(PAIR, 15)] = (df, START + 8 * 900)
+    before = df.copy()
+
+    # Тик потоку для незакритої останньої свічки
+    kraken.apply_stream_candles(
+        "XBT/USD", 15, candle_rows(START + 9 * 900, 1, 15, close=500)
+    )
+
+    updated = kraken.get_cached_ohlc(PAIR, 15)
+    assert updated is not df
+    assert updated["close"].iloc[-1] == 500.5
+    assert len(updated) == 10
+    pd.testing.assert_frame_equal(df, before)
+
+
+def test_aggregate_matches_pandas_resample():
+    kraken = KrakenDataProvider()
+    # Починається з середини години й закінчується незакритою годиною
+    df = kraken.parse_ohlc_data(candle_rows(START + 2 * 900, 49, 15))
+
+    aggregated = kraken.aggregate_ohlc(df, 60, 15)
+
+    frame = df.set_index("timestamp").assign(
+        turnover=df["vwap"].values * df["volume"].values
+    )
+    expected = frame.resample("60min", origin="epoch").agg(
+        {
+            "open": "first",
+            "high": "max",
+            "low": "min",
+            "close": "last",
+            "volume": "sum",
+            "count": "sum",
+            "turnover": "sum",
+        }
+    )
+    # Перша година неповна
+    expected = expected.iloc[1:]
+    assert aggregated["timestamp"].tolist() == expected.index.tolist()
+    for column in ["open", "high", "low", "close", "volume", "count"]:
+        np.testing.assert_allclose(aggregated[column], expected[column])
+    np.testing.assert_allclose(
+        aggregated["vwap"], expected["turnover"] / expected["volume"]
+    )
+
+
+def test_aggregate_drops_hours_with_missing_candles():
+    kraken = KrakenDataProvider()
+    df = kraken.parse_ohlc_data(candle_rows(START, 16, 15)).drop(index=6)
+
+    aggregated = kraken.aggregate_ohlc(df, 60, 15)
+
+    hours = [pd.Timestamp(START + h * 3600, unit="s") for h in (0, 2, 3)]
+    assert aggregated["timestamp"].tolist() == hours
+
+
+def test_get_candles_skips_source_with_gap():
+    now = int(time.time()) // 3600 * 3600
+    kraken = KrakenDataProvider(transport=KrakenRulesTransport(60, now))
+    source = kraken.parse_ohlc_data(candle_rows(now - 2 * 86_400, 193, 15))
+    kraken._ohlc_cache[(PAIR, 15)] = (source, now)
+    kraken._ohlc_updated_at[(PAIR, 15)] = time.time()
+
+    # Без пропусків година агрегується з 15-хвилинних свічок кешу
+    kraken.get_candles(PAIR, 60, days=1)
+    assert kraken._ohlc_sources[(PAIR, 60)] == 15
+
+    # Пропуск у джерелі: власна серія 60 з /OHLC
+    gapped = source.drop(index=170).reset_index(drop=True)
+    kraken._ohlc_cache[(PAIR, 15)] = (gapped, now)
+    df = kraken.get_candles(PAIR, 60, days=1)
+    assert (PAIR, 60) not in kraken._ohlc_sources
+    steps = np.diff(df["timestamp"].to_numpy()) / np.timedelta64(1, "m")
+    assert (steps == 60).all()
+    assert df["timestamp"].iloc[-1] == pd.Timestamp(now, unit="s")
+
+
+def test_fetch_ohlc_raises_kraken_error():
+    class RateLimited:
+        def get(self, url, params=None):
+            return FakeResponse({"error": ["EAPI:Rate limit exceeded"], "result": {}})
+
+    kraken = KrakenDataProvider(transport=RateLimited())
+    with pytest.raises(Exception, match="EAPI:Rate limit exceeded"):
+        kraken.fetch_ohlc_data(PAIR, 15, 0)
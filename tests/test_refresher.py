@@ -0,0 +1,22 @@
+from Refresher import BackgroundRefresher
+
+
+def test_retries_quickly_until_first_snapshot():
+    attempts = []
+
+    def build():
+        attempts.append(len(attempts))
+        if len(attempts) < 3:
+            raise Exception("upstream down")
+        return "pairs"
+
+    # Година між оновленнями, але перший список не чекає на неї після збою
+    refresher = BackgroundRefresher(build, interval=3600, retry=0.05)
+    try:
+        snapshot = refresher.latest(1, timeout=5)
+    finally:
+        refresher.stop()
+
+    assert snapshot is not None
+    assert snapshot.data == "pairs"
+    assert len(attempts) == 3
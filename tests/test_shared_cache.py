@@ -0,0 +1,119 @@
+import multiprocessing
+import os
+import time
+
+import pytest
+
+from SharedCache import SharedCache
+
+# Справжні процеси з fork, як воркери gunicorn
+context = multiprocessing.get_context("fork")
+
+
+def build_once(path, log, key, max_age, start, results, delay=0.3):
+    # Усі процеси стартують разом; кожна збірка дописує рядок у log
+    cache = SharedCache(path)
+
+    def build(previous):
+        with open(log, "a") as f:
+            f.write(f"{os.getpid()}\n")
+        time.sleep(delay)
+        return f"value-{os.getpid()}"
+
+    start.wait()
+    results.put(cache.get_or_refresh(key, max_age, build))
+
+
+def crash_while_building(path, key, lease_ttl):
+    # Процес отримує оренду й падає, не звільнивши її
+    cache = SharedCache(path, lease_ttl=lease_ttl)
+    cache.get_or_refresh(key, 0, lambda previous: os._exit(1))
+
+
+def build_slowly(path, key, building, delay):
+    cache = SharedCache(path)
+
+    def build(previous):
+        building.set()
+        time.sleep(delay)
+        return "new"
+
+    cache.get_or_refresh(key, 0, build)
+
+
+def run_processes(target, count, *args):
+    start = context.Barrier(count)
+    results = context.Queue()
+    processes = [
+        context.Process(target=target, args=(*args, start, results))
+        for _ in range(count)
+    ]
+    for process in processes:
+        process.start()
+    values = [results.get(timeout=30) for _ in processes]
+    for process in processes:
+        process.join(timeout=30)
+    return values
+
+
+def read_builds(log):
+    with open(log) as f:
+        return f.read().split()
+
+
+@pytest.fixture
+def paths(tmp_path):
+    return str(tmp_path / "shared.sqlite"), str(tmp_path / "builds.log")
+
+
+def test_one_build_per_expired_key(paths):
+    path, log = paths
+    SharedCache(path)
+
+    values = run_processes(build_once, 6, path, log, "key", 1)
+    builds = read_builds(log)
+    assert len(builds) == 1
+    assert values == [f"value-{builds[0]}"] * 6
+
+    # Після max_age ключ знову перебудовує рівно один процес
+    time.sleep(1.1)
+    values = run_processes(build_once, 6, path, log, "key", 1)
+    builds = read_builds(log)
+    assert len(builds) == 2
+    assert values == [f"value-{builds[1]}"] * 6
+
+
+def test_expired_lease_is_taken_over(paths):
+    path, _ = paths
+    SharedCache(path).set("key", "old")
+
+    crashed = context.Process(target=crash_while_building, args=(path, "key", 2))
+    crashed.start()
+    crashed.join(timeout=30)
+    assert crashed.exitcode == 1
+
+    # Поки оренда впалого процесу діє, інший процес чекає і отримує старе
+    # значення; після її завершення сам перебудовує ключ
+    cache = SharedCache(path, wait_timeout=0.2)
+    assert cache.get_or_refresh("key", 0, lambda previous: "new") == "old"
+    time.sleep(2)
+    assert cache.get_or_refresh("key", 0, lambda previous: "new") == "new"
+
+
+def test_waiting_falls_back_to_stale_value(paths):
+    path, _ = paths
+    SharedCache(path).set("key", "old")
+
+    building = context.Event()
+    slow = context.Process(target=build_slowly, args=(path, "key", building, 2))
+    slow.start()
+    assert building.wait(timeout=30)
+
+    # Ключ оновлює інший процес довше за wait_timeout: повертається старе значення
+    cache = SharedCache(path, wait_timeout=0.3)
+    started = time.monotonic()
+    assert cache.get_or_refresh("key", 0, lambda previous: "mine") == "old"
+    assert time.monotonic() - started < 1.5
+
+    slow.join(timeout=30)
+    assert cache.get("key")[0] == "new"
@@ -0,0 +1,51 @@
+import json
+import time
+
+import numpy as np
+import pandas as pd
+
+from KrakenAPI import KrakenDataProvider
+from main import stream_patch, stream_state
+
+PAIR = "XXBTZUSD"
+
+
+def candles(start, count):
+    rows = [
+        [start + i * 900, "1", "2", "0.5", f"{1 + i % 7}", "1.25", "1", 1]
+        for i in range(count)
+    ]
+    return KrakenDataProvider().parse_ohlc_data(rows)
+
+
+def patched_ranges(patched):
+    return {
+        operation["location"][1]: operation["params"]["value"]
+        for operation in patched.to_plotly_json()["operations"]
+        if operation["location"][0] == "layout"
+    }
+
+
+def test_stream_slides_every_row_of_the_chart():
+    kraken = KrakenDataProvider()
+    now = int(time.time()) // 900 * 900
+    df = candles(now - 95 * 900, 96)
+    indicators = [("RSI 14", "rsi", {"period": 14})]
+    figure = kraken.create_visualization(PAIR, 15, 1, df=df, indicators=indicators)
+    # Колбек отримує фігуру з FigureCache у вигляді JSON
+    figure = json.loads(figure.to_json())
+    state = stream_state(PAIR, 15, 1, df, figure)
+    assert state["axes"] == ["xaxis", "xaxis2", "xaxis3"]
+
+    # Нова свічка з потоку зсуває вікно на всіх трьох рядках, включно з RSI
+    df = pd.concat([df, candles(now + 900, 1)], ignore_index=True)
+    rsi = kraken.get_indicator(PAIR, 15, df, "rsi", period=14)["rsi"]
+    number = state["overlays"][0][0]
+    patched, state = stream_patch(df, state, [(number, rsi)])
+
+    ranges = patched_ranges(patched)
+    assert sorted(ranges) == ["xaxis", "xaxis2", "xaxis3"]
+    end = pd.Timestamp(now + 2 * 900, unit="s").isoformat()
+    assert all(value[1] == end for value in ranges.values())
+    assert state["points"][0] == 97
+    assert not np.isnan(rsi[-1])
@@ -0,0 +1,79 @@
+import time
+
+import pytest
+import requests
+
+from Metrics import UPSTREAM_REQUESTS, UPSTREAM_SECONDS, _label_key
+from Transport import CircuitOpenError, HttpTransport, endpoint_label
+
+URL = "https://api.kraken.com/0/public/OHLC"
+COOLDOWN = 0.2
+
+
+class FakeResponse:
+    status_code = 200
+    content = b"{}"
+    headers = {}
+
+
+def transport_with(outcomes):
+    # Транспорт, у якого кожен запит бере наступний результат з outcomes:
+    # виняток піднімається, відповідь повертається
+    transport = HttpTransport(
+        rate_limits={}, max_retries=0, breaker_failures=1, breaker_cooldown=COOLDOWN
+    )
+
+    def get(url, params=None, timeout=None):
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    transport.session.get = get
+    return transport
+
+
+def test_breaker_recovers_after_failed_probe():
+    transport = transport_with(
+        [
+            requests.ConnectionError("down"),
+            requests.exceptions.ChunkedEncodingError("truncated"),
+            FakeResponse(),
+            FakeResponse(),
+        ]
+    )
+
+    with pytest.raises(requests.ConnectionError):
+        transport.get(URL)
+    # Запобіжник відкритий: запит не доходить до upstream
+    with pytest.raises(CircuitOpenError):
+        transport.get(URL)
+
+    # Пробний запит після cooldown падає не з ConnectionError/Timeout
+    time.sleep(COOLDOWN)
+    with pytest.raises(requests.exceptions.ChunkedEncodingError):
+        transport.get(URL)
+    with pytest.raises(CircuitOpenError):
+        transport.get(URL)
+
+    # Наступна проба вдається і закриває запобіжник
+    time.sleep(COOLDOWN)
+    assert transport.get(URL).status_code == 200
+    assert transport.get(URL).status_code == 200
+
+
+def test_open_circuit_is_not_a_latency_sample():
+    transport = transport_with([requests.ConnectionError("down")])
+    endpoint = endpoint_label(URL)
+    with pytest.raises(requests.ConnectionError):
+        transport.get(URL)
+    samples = UPSTREAM_SECONDS.values[_label_key({"endpoint": endpoint})][2]
+    rejected_key = _label_key({"endpoint": endpoint, "status": "circuit_open"})
+    rejected = UPSTREAM_REQUESTS.values.get(rejected_key, 0)
+
+    with pytest.raises(CircuitOpenError):
+        transport.get(URL)
+
+    # Відхилений запит рахується лише лічильником запитів
+    assert UPSTREAM_REQUESTS.values[rejected_key] == rejected + 1
+    assert UPSTREAM_SECONDS.values[_label_key({"endpoint": endpoint})][2] == samples